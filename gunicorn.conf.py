@@ -0,0 +1,45 @@
+"""Gunicorn 配置
+
+由 `python manage.py serve` 使用，也可直接运行：
+
+    DJANGO_SETTINGS_MODULE=tinnitus_health.settings_prod \
+        gunicorn -c gunicorn.conf.py tinnitus_health.wsgi:application
+
+主进程预先派生多个 worker 进程；收到 HUP 信号时平滑重载（新 worker 就绪后旧 worker 处理完请求再退出），
+收到 TERM 信号时在 graceful_timeout 内处理完进行中的请求后退出。
+"""
+import multiprocessing
+import os
+
+# wsgi：多线程同步 worker，吞吐量更高；asgi：Uvicorn worker，需要 /api/events/ 推送时启用
+mode = os.environ.get('GUNICORN_MODE', 'wsgi')
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+
+# 默认的 gthread worker 每个进程有 threads 个线程，可同时处理 workers × threads 个请求；
+# 线程在等待数据库和网络时让出 GIL，进程数仍按 2 * 核数 + 1 配置以用满多核。
+# ASGI 下同步视图在每个 worker 中由同一线程依次执行，并发只来自进程数
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+
+if mode == 'asgi':
+    worker_class = 'uvicorn_worker.UvicornWorker'
+else:
+    worker_class = 'gthread'
+    threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# 与前端代理或浏览器的长连接保持时间
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+timeout = 60
+graceful_timeout = 30
+
+# 处理一定数量的请求后重启 worker，防止内存缓慢增长；加入随机量避免同时重启
+max_requests = 10000
+max_requests_jitter = 1000
+
+# 不预加载应用，HUP 重载时新 worker 会加载新代码
+preload_app = False
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+# 信任前端代理转发的 X-Forwarded-* 头
+forwarded_allow_ips = os.environ.get('GUNICORN_FORWARDED_ALLOW_IPS', '127.0.0.1')
@@ -1,5 +1,89 @@
+from datetime import datetime
+
 from django.contrib import admin
-from .models import TimeSlot, TinnitusLog, Reminder, AcupointMassage, UserProfile
+from django.contrib.admin.views.main import ORDER_VAR, ChangeList
+from django.db.models import Q
+from . import search
+from .export import export_response
+from .pagination import EstimatedCountPaginator, KeysetPaginator
+from .models import TimeSlot, TinnitusLog, Reminder, ReminderMessage, ReminderDispatch, AcupointMassage, UserProfile
+
+
+class FullTextSearchMixin:
+    """搜索框通过全文索引检索文本字段，不再对大表做 LIKE '%...%' 扫描；
+    search_fields 中的字段按各自的查找方式匹配（未写查找时为精确值），与全文检索结果取并集"""
+
+    def get_search_results(self, request, queryset, search_term):
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        condition = search.matching_q(self.model, search_term)
+        for field in self.search_fields:
+            condition |= Q(**{field: search_term})
+        return queryset.filter(condition), False
+
+
+# 游标翻页的查询参数
+AFTER_VAR = 'after'
+BEFORE_VAR = 'before'
+
+
+class KeysetChangeList(ChangeList):
+    """默认排序时按游标翻页，翻到任何一页都只读取一页数据；按列排序时退回页码分页"""
+
+    def __init__(self, request, *args, **kwargs):
+        self.cursor_after = request.GET.get(AFTER_VAR)
+        self.cursor_before = request.GET.get(BEFORE_VAR)
+        self.keyset_page = None
+        super().__init__(request, *args, **kwargs)
+        # 筛选、搜索链接不保留游标
+        for name in (AFTER_VAR, BEFORE_VAR):
+            self.params.pop(name, None)
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        for name in (AFTER_VAR, BEFORE_VAR):
+            lookup_params.pop(name, None)
+        return lookup_params
+
+    def get_results(self, request):
+        if ORDER_VAR in self.params or self.show_all:
+            return super().get_results(request)
+        paginator = self.model_admin.get_paginator(request, self.queryset, self.list_per_page)
+        page = KeysetPaginator(self.queryset, self.model_admin.keyset_fields, self.list_per_page).page(
+            after=self.cursor_after, before=self.cursor_before,
+        )
+        self.keyset_page = page
+        self.result_count = paginator.count
+        self.full_result_count = None
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        self.result_list = page.object_list
+        self.can_show_all = False
+        self.multi_page = page.has_next or page.has_previous
+        self.paginator = paginator
+
+    def keyset_url(self, name, cursor):
+        return self.get_query_string({name: cursor}, remove=[AFTER_VAR, BEFORE_VAR])
+
+    def next_page_url(self):
+        return self.keyset_url(AFTER_VAR, self.keyset_page.next_cursor)
+
+    def previous_page_url(self):
+        return self.keyset_url(BEFORE_VAR, self.keyset_page.previous_cursor)
+
+
+class LargeTableAdminMixin:
+    """大表的管理页：估算总数、游标翻页、不计算筛选项数量，
+    排序 ['-k1', ..., '-id'] 与 keyset_fields 一致并由索引支持"""
+
+    keyset_fields = ['id']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
 
 
 @admin.register(TimeSlot)
@@ -11,31 +95,63 @@ class TimeSlotAdmin(admin.ModelAdmin):
 
 
 @admin.register(TinnitusLog)
-class TinnitusLogAdmin(admin.ModelAdmin):
+class TinnitusLogAdmin(LargeTableAdminMixin, FullTextSearchMixin, admin.ModelAdmin):
     list_display = ['user', 'date', 'time_slot', 'severity', 'frequency', 'duration_minutes']
+    list_select_related = ['user', 'time_slot']
+    # 每个筛选项都有 (字段, -date, -id) 索引，筛选后仍按索引顺序读取一页
     list_filter = ['severity', 'frequency', 'time_slot', 'date']
-    search_fields = ['user__username', 'symptoms', 'triggers']
-    date_hierarchy = 'date'
-    ordering = ['-date', '-created_at']
+    # 用户名按前缀匹配，症状、诱因等文本走全文索引
+    search_fields = ['user__username__istartswith']
+    autocomplete_fields = ['user']
+    ordering = ['-date', '-id']
+    keyset_fields = ['date', 'id']
+    actions = ['export_as_csv', 'export_as_jsonl']
+    
+    @admin.action(description='导出所选日记（CSV）')
+    def export_as_csv(self, request, queryset):
+        return export_response(queryset, 'csv', f'tinnitus-log-{datetime.now():%Y%m%d}', include_user=True)
+    
+    @admin.action(description='导出所选日记（JSONL）')
+    def export_as_jsonl(self, request, queryset):
+        return export_response(queryset, 'jsonl', f'tinnitus-log-{datetime.now():%Y%m%d}', include_user=True)
 
 
 @admin.register(Reminder)
 class ReminderAdmin(admin.ModelAdmin):
     list_display = ['user', 'time_slot', 'is_active', 'created_at']
+    list_select_related = ['user', 'time_slot']
     list_filter = ['is_active', 'time_slot']
     search_fields = ['user__username', 'time_slot__chinese_name']
+    autocomplete_fields = ['user']
+
+
+@admin.register(ReminderMessage)
+class ReminderMessageAdmin(admin.ModelAdmin):
+    list_display = ['user', 'time_slot', 'created_at', 'read_at']
+    list_filter = ['time_slot']
+    list_select_related = ['user', 'time_slot']
+    raw_id_fields = ['user']
+
+
+@admin.register(ReminderDispatch)
+class ReminderDispatchAdmin(admin.ModelAdmin):
+    list_display = ['time_slot', 'boundary', 'sent_count', 'started_at', 'completed_at']
+    list_filter = ['time_slot']
+    list_select_related = ['time_slot']
 
 
 @admin.register(AcupointMassage)
-class AcupointMassageAdmin(admin.ModelAdmin):
+class AcupointMassageAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = ['name', 'body_part', 'created_at']
     list_filter = ['body_part']
-    search_fields = ['name', 'location_description']
+    search_fields = ['name']
     filter_horizontal = ['related_time_slots']
 
 
 @admin.register(UserProfile)
 class UserProfileAdmin(admin.ModelAdmin):
     list_display = ['user', 'gender', 'birth_date', 'tinnitus_start_date']
+    list_select_related = ['user']
     list_filter = ['gender', 'constitution_type']
     search_fields = ['user__username', 'user__email']
+    autocomplete_fields = ['user']
@@ -0,0 +1,22 @@
+"""压测命令共用的工具函数
+
+bench_db、bench_sessions、benchmark 和 loadtest 命令用来汇总延迟分位数
+及构造请求的 Host。
+"""
+from django.conf import settings
+
+
+def percentile(values, fraction):
+    """values 中位于 fraction 分位的值，values 为空时返回 0"""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def client_host():
+    """测试客户端使用的 Host，需在 ALLOWED_HOSTS 中"""
+    for host in settings.ALLOWED_HOSTS:
+        if host not in ('*', '') and not host.startswith('.'):
+            return host
+    return 'localhost'
@@ -0,0 +1,124 @@
+"""缓存工具
+
+页面缓存只用于匿名访问：登录用户的导航栏等内容因人而异，始终直接渲染。
+缓存键包含内容版本号，时辰或穴位被修改时由信号更新版本号，旧页面随之失效。
+每位用户另有日记版本号，用户写日记时更新，用于缓存依赖日记的分析结果。
+版本号保存在缓存中，使用文件缓存时各工作进程共享同一版本。
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+CONTENT_VERSION_KEY = 'content_version'
+USER_DIARY_VERSION_KEY = 'diary_version:{user_id}'
+
+
+def _get_version(key):
+    version = cache.get(key)
+    if version is None:
+        # 版本号被淘汰后以当前时间重建，不会与旧版本号重复
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def _bump_version(key):
+    cache.set(key, time.time_ns(), None)
+
+
+def get_content_version():
+    """获取内容版本号"""
+    return _get_version(CONTENT_VERSION_KEY)
+
+
+def bump_content_version():
+    """更新内容版本号，使依赖内容的缓存全部失效"""
+    _bump_version(CONTENT_VERSION_KEY)
+
+
+def get_user_diary_version(user_id):
+    """获取用户日记版本号"""
+    return _get_version(USER_DIARY_VERSION_KEY.format(user_id=user_id))
+
+
+def bump_user_diary_version(user_id):
+    """更新用户日记版本号，使依赖该用户日记的缓存失效"""
+    _bump_version(USER_DIARY_VERSION_KEY.format(user_id=user_id))
+
+
+def _is_cacheable_request(request):
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    if request.user.is_authenticated:
+        return False
+    # 有待显示的提示消息时不使用缓存
+    return 'messages' not in request.COOKIES
+
+
+def _is_cacheable_response(request, response):
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        and not request.META.get('CSRF_COOKIE_NEEDS_UPDATE')
+    )
+
+
+def _query_key(request, query_params):
+    """由视图使用的查询参数生成缓存键的一部分
+
+    出现其他参数、参数重复或取值不在允许范围内时返回 None，不缓存该请求，
+    避免随意构造的查询字符串占满缓存。
+    """
+    if not set(request.GET) <= set(query_params):
+        return None
+    parts = []
+    for name in sorted(request.GET):
+        values = request.GET.getlist(name)
+        if len(values) > 1 or values[0] not in query_params[name]:
+            return None
+        parts.append(f'{name}={values[0]}')
+    return '&'.join(parts)
+
+
+def anonymous_cache_page(key_func=None, timeout=None, query_params=None):
+    """匿名访问的整页缓存
+
+    key_func(request) 返回附加到缓存键中的内容，例如当前时辰；
+    timeout 可以是秒数或返回秒数的函数，默认取 PAGE_CACHE_TIMEOUT；
+    query_params 为视图使用的查询参数及各自允许的取值，带其他查询参数的请求不缓存。
+    """
+    query_params = query_params or {}
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if not _is_cacheable_request(request):
+                return view_func(request, *args, **kwargs)
+            query = _query_key(request, query_params)
+            if query is None:
+                return view_func(request, *args, **kwargs)
+
+            parts = [view_func.__name__, str(get_content_version()), request.path, query]
+            if key_func is not None:
+                parts.append(str(key_func(request)))
+            key = 'page:' + hashlib.md5('|'.join(parts).encode()).hexdigest()
+
+            cached = cache.get(key)
+            if cached is not None:
+                content, content_type = cached
+                return HttpResponse(content, content_type=content_type)
+
+            response = view_func(request, *args, **kwargs)
+            if _is_cacheable_response(request, response):
+                page_timeout = timeout() if callable(timeout) else timeout
+                if page_timeout is None:
+                    page_timeout = settings.PAGE_CACHE_TIMEOUT
+                cache.set(key, (response.content, response['Content-Type']), page_timeout)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,106 @@
+"""耳鸣养生助手页的用户快照
+
+每位用户在缓存中保存一份快照：最近 5 条日记、有效提醒的时辰和内容、连续记录天数。
+日记或提醒写入时（信号，及绕过信号的批量写入处显式调用）在事务提交后重建快照，
+助手页只读取这一项缓存，时辰名称等由进程内的时辰查找表补全，不再查询日记和提醒表。
+快照缺失或过期时当场重建（三条查询）并写回缓存。
+"""
+from datetime import date, timedelta
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Reminder, TinnitusDailyAggregate, TinnitusLog
+from .time_slots import get_index
+
+SNAPSHOT_KEY = 'dashboard:{user_id}'
+RECENT_LOG_COUNT = 5
+# 快照中保存的日记字段，按此顺序存为元组
+LOG_FIELDS = (
+    'id', 'date', 'time_slot_id', 'severity', 'frequency', 'duration_minutes', 'symptoms', 'triggers',
+    'massage_points', 'massage_effect', 'mood', 'sleep_quality', 'notes',
+)
+# 计算连续记录天数时最多读取的日期数
+MAX_STREAK_DAYS = 366
+
+
+def _key(user_id):
+    return SNAPSHOT_KEY.format(user_id=user_id)
+
+
+def _streak(dates):
+    """从最近一天往前数连续有日记的天数"""
+    streak = 0
+    expected = dates[0] if dates else None
+    for day in dates:
+        if day != expected:
+            break
+        streak += 1
+        expected = day - timedelta(days=1)
+    return streak
+
+
+def build(user_id):
+    """从数据库生成快照"""
+    logs = list(TinnitusLog.objects.filter(user_id=user_id).values_list(*LOG_FIELDS)[:RECENT_LOG_COUNT])
+    reminders = list(
+        Reminder.objects.filter(user_id=user_id, is_active=True)
+        .order_by('time_slot__start_time').values_list('time_slot_id', 'custom_message')
+    )
+    dates = list(
+        TinnitusDailyAggregate.objects.filter(user_id=user_id)
+        .order_by('-date').values_list('date', flat=True).distinct()[:MAX_STREAK_DAYS]
+    )
+    return {
+        'logs': logs,
+        'reminders': reminders,
+        'last_date': dates[0] if dates else None,
+        'streak': _streak(dates),
+    }
+
+
+def refresh(user_id):
+    """重建并保存快照"""
+    snapshot = build(user_id)
+    cache.set(_key(user_id), snapshot, settings.DASHBOARD_SNAPSHOT_TIMEOUT)
+    return snapshot
+
+
+def refresh_on_commit(user_id):
+    """当前事务提交后重建快照，不在事务中时立即重建"""
+    transaction.on_commit(partial(refresh, user_id))
+
+
+def invalidate(user_ids):
+    cache.delete_many([_key(user_id) for user_id in user_ids])
+
+
+def get_dashboard(user_id, today=None):
+    """助手页的模板数据，命中缓存时不查询数据库"""
+    snapshot = cache.get(_key(user_id))
+    if snapshot is None:
+        snapshot = refresh(user_id)
+
+    slots = get_index().by_id
+    recent_logs = []
+    for row in snapshot['logs']:
+        log = TinnitusLog(**dict(zip(LOG_FIELDS, row)))
+        log.time_slot = slots.get(log.time_slot_id)
+        recent_logs.append(log)
+    reminders = [
+        Reminder(time_slot=slots[time_slot_id], custom_message=custom_message, is_active=True)
+        for time_slot_id, custom_message in snapshot['reminders'] if time_slot_id in slots
+    ]
+
+    # 最近一次记录早于昨天时连续记录已中断
+    today = today or date.today()
+    last_date = snapshot['last_date']
+    streak = snapshot['streak'] if last_date and last_date >= today - timedelta(days=1) else 0
+    return {
+        'recent_logs': recent_logs,
+        'reminders': reminders,
+        'last_log': recent_logs[0] if recent_logs else None,
+        'streak_days': streak,
+    }
@@ -0,0 +1,131 @@
+"""时辰切换事件推送（Server-Sent Events）
+
+每个打开的页面在 ASGI 下保持一个异步长连接。进程内只有一个广播任务：
+睡眠到下一次时辰切换，把新时辰的数据序列化一次后分发给全部连接，
+并用一次查询取出已连接用户在新时辰的有效提醒，只推送给对应的连接。
+没有连接时广播任务自动退出，有新连接时再启动。
+"""
+import asyncio
+import json
+from datetime import datetime
+
+from asgiref.sync import sync_to_async
+
+from .models import Reminder
+from .reminders import reminder_content, reminder_title
+from .time_slots import current_time_slot, get_index, slot_payload
+
+# 无事件时发送注释行保持连接，避免被代理断开
+KEEPALIVE_SECONDS = 30
+# 浏览器断线后的重连间隔（毫秒）
+RETRY_MILLISECONDS = 5000
+# 每个连接最多积压的事件数，慢速客户端超出后丢弃
+SUBSCRIBER_QUEUE_SIZE = 16
+
+
+def format_event(event, data):
+    """编码为 SSE 消息"""
+    return f'event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n'.encode('utf-8')
+
+
+class Subscriber:
+    def __init__(self, user_id=None):
+        self.user_id = user_id
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def put(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            pass
+
+
+def _due_reminders(slot, user_ids):
+    """已连接用户在该时辰的有效提醒，user_id -> 编码后的消息"""
+    if not user_ids:
+        return {}
+    reminders = (
+        Reminder.objects
+        .filter(time_slot=slot, is_active=True, user_id__in=user_ids)
+        .only('id', 'user_id', 'time_slot_id', 'custom_message')
+    )
+    messages = {}
+    for reminder in reminders:
+        reminder.time_slot = slot
+        messages[reminder.user_id] = format_event('reminder', {
+            'time_slot': slot.name,
+            'title': reminder_title(reminder),
+            'content': reminder_content(reminder),
+        })
+    return messages
+
+
+class SlotBroadcaster:
+    """进程内的时辰广播器"""
+
+    def __init__(self):
+        self.subscribers = set()
+        self.current_slot = None
+        self.current_message = None
+        self.published_slot_name = None
+        self._task = None
+
+    async def subscribe(self, user_id=None):
+        subscriber = Subscriber(user_id)
+        slot = await self.refresh()
+        self.subscribers.add(subscriber)
+        if slot is not None:
+            subscriber.put(self.current_message)
+        task = self._task
+        if task is None or task.done() or task.get_loop() is not asyncio.get_running_loop():
+            self._task = asyncio.create_task(self._run())
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        self.subscribers.discard(subscriber)
+
+    async def refresh(self, now=None):
+        """返回当前时辰，时辰变化时才重新序列化消息"""
+        slot = await sync_to_async(current_time_slot)(now)
+        if slot is not None and slot is not self.current_slot:
+            self.current_slot = slot
+            self.current_message = format_event('slot', slot_payload(slot))
+        return slot
+
+    async def publish(self, now=None):
+        """时辰切换时向全部连接推送新时辰及到期提醒，同一时辰只推送一次"""
+        slot = await self.refresh(now)
+        if slot is None or slot.name == self.published_slot_name:
+            return
+        self.published_slot_name = slot.name
+        subscribers = list(self.subscribers)
+        user_ids = {subscriber.user_id for subscriber in subscribers if subscriber.user_id}
+        reminders = await sync_to_async(_due_reminders)(slot, user_ids)
+        for subscriber in subscribers:
+            subscriber.put(self.current_message)
+            if subscriber.user_id in reminders:
+                subscriber.put(reminders[subscriber.user_id])
+
+    async def _run(self):
+        while self.subscribers:
+            delay = await sync_to_async(lambda: get_index().seconds_until_change())()
+            await asyncio.sleep((delay or 60) + 1)
+            await self.publish(datetime.now())
+
+
+broadcaster = SlotBroadcaster()
+
+
+async def event_stream(user_id=None):
+    """单个连接的事件流，开始输出时订阅，连接断开时取消订阅"""
+    subscriber = await broadcaster.subscribe(user_id)
+    try:
+        yield f'retry: {RETRY_MILLISECONDS}\n\n'.encode('utf-8')
+        while True:
+            try:
+                message = await asyncio.wait_for(subscriber.queue.get(), KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                message = b': keepalive\n\n'
+            yield message
+    finally:
+        broadcaster.unsubscribe(subscriber)
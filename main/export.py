@@ -0,0 +1,79 @@
+"""耳鸣日记导出
+
+以 StreamingHttpResponse 逐行输出 CSV 或 JSONL，数据库按块读取，
+时辰名称取自进程内查找表而不联表查询，内存占用与记录数无关。
+"""
+import csv
+import json
+
+from django.http import StreamingHttpResponse
+
+from .time_slots import get_index
+
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_FIELDS = [
+    'severity', 'frequency', 'duration_minutes', 'symptoms', 'triggers',
+    'massage_points', 'massage_effect', 'mood', 'sleep_quality', 'notes', 'created_at',
+]
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+
+
+class Echo:
+    """供 csv.writer 使用的伪文件对象，write 直接返回写入的内容"""
+
+    def write(self, value):
+        return value
+
+
+def iter_rows(queryset, include_user=False):
+    """按时间顺序逐条产生导出字典"""
+    slots = get_index().by_id
+    columns = ['date', 'time_slot_id', *EXPORT_FIELDS]
+    if include_user:
+        columns = ['user__username', *columns]
+    rows = queryset.order_by('date', 'created_at', 'id').values_list(*columns)
+    for values in rows.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        row = dict(zip(columns, values))
+        slot = slots.get(row.pop('time_slot_id'))
+        record = {}
+        if include_user:
+            record['username'] = row.pop('user__username')
+        record['date'] = row.pop('date').isoformat()
+        record['time_slot'] = slot.name if slot else ''
+        record['time_slot_name'] = slot.chinese_name if slot else ''
+        row['created_at'] = row['created_at'].isoformat(sep=' ', timespec='seconds')
+        record.update(row)
+        yield record
+
+
+def export_header(include_user=False):
+    header = ['date', 'time_slot', 'time_slot_name', *EXPORT_FIELDS]
+    return ['username', *header] if include_user else header
+
+
+def iter_csv(queryset, include_user=False):
+    writer = csv.writer(Echo())
+    # UTF-8 BOM，便于 Excel 正确识别中文
+    yield '\ufeff' + writer.writerow(export_header(include_user))
+    for record in iter_rows(queryset, include_user):
+        yield writer.writerow(['' if value is None else value for value in record.values()])
+
+
+def iter_jsonl(queryset, include_user=False):
+    for record in iter_rows(queryset, include_user):
+        yield json.dumps(record, ensure_ascii=False) + '\n'
+
+
+def export_response(queryset, fmt, filename, include_user=False):
+    """生成流式导出响应"""
+    stream = iter_csv if fmt == 'csv' else iter_jsonl
+    response = StreamingHttpResponse(
+        stream(queryset, include_user), content_type=EXPORT_FORMATS[fmt]
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{fmt}"'
+    return response
@@ -43,6 +43,21 @@ class TinnitusLogForm(forms.ModelForm):
         }
 
 
+class TinnitusLogImportForm(forms.Form):
+    """耳鸣日记导入表单"""
+    file = forms.FileField(
+        label='日记文件',
+        help_text='支持本站导出的 CSV 或 JSONL 文件',
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,.jsonl'})
+    )
+    
+    def clean_file(self):
+        file = self.cleaned_data['file']
+        if not file.name.lower().endswith(('.csv', '.jsonl')):
+            raise forms.ValidationError('仅支持 CSV 或 JSONL 文件')
+        return file
+
+
 class ReminderForm(forms.ModelForm):
     """提醒设置表单"""
     
@@ -0,0 +1,106 @@
+"""穴位图片处理
+
+上传图片后生成缩略图、中图、大图三种宽度，每种同时输出 WebP 和 JPEG，
+页面通过 srcset 让浏览器按显示尺寸选择最小的合适文件。
+文件名包含原图内容和处理参数的哈希，内容不变时不会重复生成，
+内容变化时产生新文件名，可对 media 设置长期缓存。
+"""
+import hashlib
+import io
+from pathlib import PurePosixPath
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+# 各档宽度（像素），不超过原图宽度
+VARIANT_WIDTHS = [('thumb', 400), ('medium', 800), ('full', 1600)]
+VARIANT_FORMATS = {
+    'webp': ('WEBP', {'quality': 75, 'method': 6}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+VARIANT_DIR = 'acupoints/variants'
+# 修改上面的处理参数时递增，使已有文件名失效
+PIPELINE_VERSION = 1
+
+
+def _digest(data):
+    spec = repr((PIPELINE_VERSION, VARIANT_WIDTHS, VARIANT_FORMATS)).encode('utf-8')
+    return hashlib.sha256(spec + data).hexdigest()[:12]
+
+
+def _variant_name(stem, label, digest, fmt):
+    return f'{VARIANT_DIR}/{stem}-{label}-{digest}.{"jpg" if fmt == "jpeg" else fmt}'
+
+
+def generate_variants(image_field, storage=default_storage):
+    """为图片生成各档尺寸和格式，返回保存到 image_variants 的数据"""
+    with image_field.open('rb') as source:
+        data = source.read()
+    digest = _digest(data)
+    stem = PurePosixPath(image_field.name).stem
+
+    image = ImageOps.exif_transpose(Image.open(io.BytesIO(data)))
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+
+    variants = []
+    widths = sorted({min(width, image.width) for _, width in VARIANT_WIDTHS})
+    for label, width in zip([label for label, _ in VARIANT_WIDTHS], widths):
+        height = round(image.height * width / image.width)
+        variant = {'label': label, 'width': width, 'height': height}
+        resized = None
+        for fmt, (pil_format, options) in VARIANT_FORMATS.items():
+            name = _variant_name(stem, label, digest, fmt)
+            if not storage.exists(name):
+                if resized is None:
+                    resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+                buffer = io.BytesIO()
+                resized.save(buffer, pil_format, **options)
+                name = storage.save(name, ContentFile(buffer.getvalue()))
+            variant[fmt] = name
+        variants.append(variant)
+
+    return {'source': image_field.name, 'digest': digest, 'variants': variants}
+
+
+def variants_are_current(image_field, image_variants, storage=default_storage):
+    """已生成的文件是否对应当前图片且都存在"""
+    if not image_variants or image_variants.get('source') != image_field.name:
+        return False
+    return all(
+        storage.exists(variant[fmt])
+        for variant in image_variants.get('variants', [])
+        for fmt in VARIANT_FORMATS
+    )
+
+
+def refresh_variants(acupoint, force=False, storage=default_storage):
+    """图片更换或版本文件缺失时重新生成，返回 image_variants 是否有变化"""
+    image = acupoint.image
+    if not image or not storage.exists(image.name):
+        variants = {}
+    elif force or not variants_are_current(image, acupoint.image_variants, storage):
+        variants = generate_variants(image, storage)
+    else:
+        return False
+    if variants == acupoint.image_variants:
+        return False
+    acupoint.image_variants = variants
+    type(acupoint).objects.filter(pk=acupoint.pk).update(image_variants=variants)
+    return True
+
+
+def srcset(image_variants, fmt, storage=default_storage):
+    return ', '.join(
+        f'{storage.url(variant[fmt])} {variant["width"]}w'
+        for variant in image_variants.get('variants', [])
+    )
+
+
+def thumbnail(image_variants, storage=default_storage):
+    variants = image_variants.get('variants') if image_variants else None
+    if not variants:
+        return None
+    smallest = variants[0]
+    return {'url': storage.url(smallest['jpeg']), 'width': smallest['width'], 'height': smallest['height']}
@@ -0,0 +1,146 @@
+"""耳鸣日记批量导入
+
+逐行读取上传的 CSV 或 JSONL（格式与导出一致），按 TinnitusLogForm 的规则校验，
+文件为 UTF-8 或 GBK 编码（Excel 在中文系统中另存的 CSV），导入前先确定编码，
+时辰名称通过进程内查找表转换为 ID，校验通过的记录在同一事务中分批 bulk_create。
+bulk_create 不触发信号，每批写入后更新全文索引，导入后统一重建涉及日期的每日汇总、使报告缓存失效并重建助手页快照。
+"""
+import codecs
+import csv
+import io
+import json
+
+from django.db import transaction
+
+from . import dashboard, search, stats
+from .caching import bump_user_diary_version
+from .forms import TinnitusLogForm
+from .models import TinnitusLog
+from .time_slots import get_index
+
+IMPORT_BATCH_SIZE = 500
+# 最多报告的错误行数
+MAX_REPORTED_ERRORS = 100
+# 依次尝试的文件编码，GB18030 兼容 GBK
+ENCODINGS = ('utf-8-sig', 'gb18030')
+
+
+class TinnitusLogRowForm(TinnitusLogForm):
+    """导入行校验表单，时辰由导入器单独解析"""
+
+    class Meta(TinnitusLogForm.Meta):
+        fields = [field for field in TinnitusLogForm.Meta.fields if field != 'time_slot']
+
+
+class ImportResult:
+    def __init__(self):
+        self.imported = 0
+        self.error_count = 0
+        self.errors = []
+
+    def add_error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+
+def _time_slot_lookup():
+    """时辰代码和中文名称到时辰的映射"""
+    index = get_index()
+    lookup = dict(index.by_name)
+    lookup.update({slot.chinese_name: slot for slot in index.slots})
+    return lookup
+
+
+def detect_encoding(uploaded_file):
+    """返回能解码整个文件的编码，均无法解码时抛出 UnicodeDecodeError"""
+    for encoding in ENCODINGS:
+        decoder = codecs.getincrementaldecoder(encoding)()
+        try:
+            for chunk in uploaded_file.chunks():
+                decoder.decode(chunk)
+            decoder.decode(b'', final=True)
+        except UnicodeDecodeError as error:
+            last_error = error
+        else:
+            return encoding
+        finally:
+            uploaded_file.seek(0)
+    raise last_error
+
+
+def iter_records(uploaded_file, encoding='utf-8-sig'):
+    """逐行产生 (行号, 字典)，无法解析的行产生 (行号, None)"""
+    text = io.TextIOWrapper(uploaded_file, encoding=encoding, newline='')
+    if uploaded_file.name.lower().endswith('.csv'):
+        reader = csv.DictReader(text)
+        for record in reader:
+            yield reader.line_num, record
+        return
+    for line_num, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        yield line_num, record if isinstance(record, dict) else None
+
+
+def import_logs(user, uploaded_file):
+    """导入日记，返回 ImportResult；文件编码无法识别时抛出 UnicodeDecodeError，不写入任何记录"""
+    encoding = detect_encoding(uploaded_file)
+    result = ImportResult()
+    slots = _time_slot_lookup()
+    batch = []
+    first_date = last_date = None
+
+    def flush():
+        TinnitusLog.objects.bulk_create(batch)
+        search.index_logs(batch)
+        result.imported += len(batch)
+        batch.clear()
+
+    with transaction.atomic():
+        for line, record in iter_records(uploaded_file, encoding):
+            if record is None:
+                result.add_error(line, '无法解析该行')
+                continue
+
+            slot_value = record.get('time_slot')
+            if slot_value in (None, ''):
+                slot_value = record.get('time_slot_name')
+            # JSONL 中的时辰可能是数字等非字符串值，按未知时辰报告
+            slot_value = '' if slot_value is None else str(slot_value).strip()
+            slot = slots.get(slot_value)
+            if slot_value and slot is None:
+                result.add_error(line, f'未知的时辰：{slot_value}')
+                continue
+
+            form = TinnitusLogRowForm({key: value if value is not None else '' for key, value in record.items()})
+            if not form.is_valid():
+                message = '；'.join(
+                    f'{form.fields[field].label if field in form.fields else field}：{" ".join(errors)}'
+                    for field, errors in form.errors.items()
+                )
+                result.add_error(line, message)
+                continue
+
+            log = form.save(commit=False)
+            log.user = user
+            log.time_slot = slot
+            batch.append(log)
+            first_date = min(first_date or log.date, log.date)
+            last_date = max(last_date or log.date, log.date)
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                flush()
+
+        if batch:
+            flush()
+        if result.imported:
+            stats.rebuild_range(user.id, first_date, last_date)
+
+    if result.imported:
+        bump_user_diary_version(user.id)
+        dashboard.refresh_on_commit(user.id)
+    return result
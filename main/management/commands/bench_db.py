@@ -0,0 +1,162 @@
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections, transaction
+from django.db.models import F
+
+from main.benchmarks import percentile
+from main.models import TimeSlot, TinnitusDailyAggregate, TinnitusLog
+
+# 对照组：SQLite 默认设置，每个请求新建连接，事务以 DEFERRED 开始
+BASELINE_PROFILE = {
+    'CONN_MAX_AGE': 0,
+    'OPTIONS': {},
+    'PRAGMAS': {'journal_mode': 'DELETE', 'synchronous': 'FULL'},
+}
+
+# 写入日记分布的天数
+BENCH_DAYS = 365
+
+
+def production_profile():
+    """settings_prod 使用的 SQLite 生产配置"""
+    profile = settings.SQLITE_PRODUCTION_PROFILE
+    return {
+        'CONN_MAX_AGE': profile.get('CONN_MAX_AGE', 0),
+        'OPTIONS': profile.get('OPTIONS', {}),
+        'PRAGMAS': profile.get('PRAGMAS', {}),
+    }
+
+
+class Command(BaseCommand):
+    help = '在数据库副本上并发读写，对比 SQLite 默认设置与生产配置的吞吐量'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seconds', type=float, default=10, help='每种配置的运行时间（秒）')
+        parser.add_argument('--readers', type=int, default=8, help='读线程数')
+        parser.add_argument('--writers', type=int, default=4, help='写线程数')
+        parser.add_argument(
+            '--profile', choices=['baseline', 'production', 'both'], default='both', help='要测试的配置'
+        )
+
+    def handle(self, *args, **options):
+        source = connections['default']
+        if source.vendor != 'sqlite':
+            raise CommandError('bench_db 仅用于 SQLite 数据库')
+
+        profiles = {'baseline': BASELINE_PROFILE, 'production': production_profile()}
+        if options['profile'] != 'both':
+            profiles = {options['profile']: profiles[options['profile']]}
+
+        workdir = Path(tempfile.mkdtemp(prefix='bench_db_'))
+        try:
+            # 在当前数据库的副本上测试，不影响线上数据
+            snapshot = workdir / 'snapshot.sqlite3'
+            source.ensure_connection()
+            target = sqlite3.connect(snapshot)
+            source.connection.backup(target)
+            target.close()
+
+            self.stdout.write(
+                f'读线程 {options["readers"]}，写线程 {options["writers"]}，每种配置运行 {options["seconds"]} 秒'
+            )
+            self.stdout.write(f'{"配置":<12}{"读/秒":>10}{"写/秒":>10}{"读 p95(ms)":>12}{"写 p95(ms)":>12}{"锁错误":>8}')
+            for name, profile in profiles.items():
+                path = workdir / f'{name}.sqlite3'
+                shutil.copy(snapshot, path)
+                result = self.run_profile(name, path, profile, options)
+                self.stdout.write(
+                    f'{name:<12}{result["reads"] / result["elapsed"]:>10.1f}'
+                    f'{result["writes"] / result["elapsed"]:>10.1f}'
+                    f'{percentile(result["read_latency"], 0.95) * 1000:>12.2f}'
+                    f'{percentile(result["write_latency"], 0.95) * 1000:>12.2f}'
+                    f'{result["errors"]:>8}'
+                )
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def run_profile(self, name, path, profile, options):
+        alias = f'bench_{name}'
+        connections.settings[alias] = {
+            **connections['default'].settings_dict,
+            **profile,
+            'NAME': str(path),
+        }
+        try:
+            user, _ = User.objects.using(alias).get_or_create(username='bench_db')
+            slot_ids = list(TimeSlot.objects.using(alias).values_list('id', flat=True)) or [None]
+            today = date.today()
+            TinnitusDailyAggregate.objects.using(alias).bulk_create([
+                TinnitusDailyAggregate(user=user, date=today - timedelta(days=offset), slot_name='')
+                for offset in range(BENCH_DAYS)
+            ], ignore_conflicts=True)
+            connections[alias].close()
+
+            result = {'reads': 0, 'writes': 0, 'errors': 0, 'read_latency': [], 'write_latency': []}
+            lock = threading.Lock()
+            deadline = time.monotonic() + options['seconds']
+            threads = [
+                threading.Thread(target=self.worker, args=(alias, operation, user.id, slot_ids, deadline, result, lock))
+                for operation in ['read'] * options['readers'] + ['write'] * options['writers']
+            ]
+            started = time.monotonic()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            result['elapsed'] = time.monotonic() - started
+            return result
+        finally:
+            connections[alias].close()
+            del connections[alias]
+            del connections.settings[alias]
+
+    def worker(self, alias, operation, user_id, slot_ids, deadline, result, lock):
+        run = self.read if operation == 'read' else self.write
+        count, errors, latencies = 0, 0, []
+        try:
+            while time.monotonic() < deadline:
+                started = time.monotonic()
+                try:
+                    run(alias, user_id, slot_ids[count % len(slot_ids)], count)
+                except OperationalError:
+                    errors += 1
+                else:
+                    count += 1
+                    latencies.append(time.monotonic() - started)
+                # 与请求结束时一致：未启用持久连接时关闭连接
+                connections[alias].close_if_unusable_or_obsolete()
+        finally:
+            connections[alias].close()
+        with lock:
+            result[f'{operation}s'] += count
+            result['errors'] += errors
+            result[f'{operation}_latency'].extend(latencies)
+
+    def read(self, alias, user_id, slot_id, count):
+        """日记列表首页及总数"""
+        logs = TinnitusLog.objects.using(alias).filter(user_id=user_id)
+        list(logs.order_by('-date', '-created_at')[:20])
+        logs.count()
+
+    def write(self, alias, user_id, slot_id, count):
+        """新增日记并更新每日汇总，与保存日记时的事务一致"""
+        day = date.today() - timedelta(days=count % BENCH_DAYS)
+        aggregates = TinnitusDailyAggregate.objects.using(alias).filter(user_id=user_id, date=day, slot_name='')
+        with transaction.atomic(using=alias):
+            # 保存日记前先读取旧记录（见 signals.remember_tinnitus_log_bucket），事务由读开始
+            aggregates.values('log_count').first()
+            # bulk_create 不触发信号，避免信号处理函数写入 default 数据库
+            TinnitusLog.objects.using(alias).bulk_create([TinnitusLog(
+                user_id=user_id, date=day, time_slot_id=slot_id,
+                severity=5, frequency='continuous', duration_minutes=30,
+            )])
+            aggregates.update(log_count=F('log_count') + 1, severity_sum=F('severity_sum') + 5)
@@ -0,0 +1,100 @@
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth import login
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.auth.models import User
+from django.contrib.messages.middleware import MessageMiddleware
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+
+from main.benchmarks import client_host, percentile
+
+# 对比的配置：(名称, 会话后端, 消息存储)，baseline 为 Django 默认配置
+PROFILES = [
+    ('baseline', 'django.contrib.sessions.backends.db', 'django.contrib.messages.storage.fallback.FallbackStorage'),
+    ('cached_db', 'django.contrib.sessions.backends.cached_db', 'django.contrib.messages.storage.cookie.CookieStorage'),
+    ('signed_cookies', 'django.contrib.sessions.backends.signed_cookies',
+     'django.contrib.messages.storage.cookie.CookieStorage'),
+]
+
+
+class StatementCounter:
+    """分别统计 SQL 总条数和写入条数的 execute_wrapper"""
+
+    def __init__(self):
+        self.queries = 0
+        self.writes = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries += 1
+        if sql.lstrip()[:6].upper() in ('INSERT', 'UPDATE', 'DELETE'):
+            self.writes += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = '测量会话、认证和消息中间件在每个请求上的耗时和 SQL 条数，对比 Django 默认配置与当前可选配置'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=2000, help='每种配置、每个场景的请求次数')
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(is_active=True).order_by('id').first()
+        if user is None:
+            raise CommandError('没有用户，请先运行 init_data')
+
+        def logged_in_view(request):
+            request.user.is_authenticated
+            return HttpResponse()
+
+        def login_view(request):
+            login(request, user, backend=settings.AUTHENTICATION_BACKENDS[0])
+            return HttpResponse()
+
+        self.stdout.write(f'每种配置、每个场景 {options["iterations"]} 次，只经过会话、认证和消息中间件')
+        self.stdout.write(f'{"配置":<16}{"场景":<8}{"p50(µs)":>10}{"p95(µs)":>10}{"SQL/请求":>10}{"写入/请求":>10}')
+        for name, engine, message_storage in PROFILES:
+            with override_settings(SESSION_ENGINE=engine, MESSAGE_STORAGE=message_storage):
+                for scenario, view in [('已登录', logged_in_view), ('登录', login_view)]:
+                    latencies, counter = self.run_scenario(view, user, options['iterations'])
+                    self.stdout.write(
+                        f'{name:<16}{scenario:<8}{percentile(latencies, 0.5) * 1e6:>10.1f}'
+                        f'{percentile(latencies, 0.95) * 1e6:>10.1f}'
+                        f'{counter.queries / len(latencies):>10.2f}{counter.writes / len(latencies):>10.2f}'
+                    )
+
+    def run_scenario(self, view, user, iterations):
+        """以同一个已登录会话的 Cookie 重复请求，返回每次的耗时和 SQL 统计"""
+        handler = SessionMiddleware(AuthenticationMiddleware(MessageMiddleware(view)))
+        factory = RequestFactory(HTTP_HOST=client_host())
+        store_class = import_module(settings.SESSION_ENGINE).SessionStore
+
+        # 先登录一次取得会话 Cookie
+        request = factory.get('/')
+        SessionMiddleware(lambda request: HttpResponse())(request)
+        login(request, user, backend=settings.AUTHENTICATION_BACKENDS[0])
+        request.session.save()
+        session_key = request.session.session_key
+
+        counter = StatementCounter()
+        latencies = []
+        try:
+            for _ in range(iterations):
+                request = factory.get('/')
+                request.COOKIES[settings.SESSION_COOKIE_NAME] = session_key
+                started = time.perf_counter()
+                with connection.execute_wrapper(counter):
+                    response = handler(request)
+                latencies.append(time.perf_counter() - started)
+                # 登录会更换会话，下次请求使用新的会话
+                if settings.SESSION_COOKIE_NAME in response.cookies:
+                    store_class(session_key).delete()
+                    session_key = response.cookies[settings.SESSION_COOKIE_NAME].value
+        finally:
+            store_class(session_key).delete()
+        return latencies, counter
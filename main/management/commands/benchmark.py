@@ -0,0 +1,219 @@
+import json
+import multiprocessing
+import platform
+import time
+from urllib.parse import urlsplit
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+
+from main.benchmarks import client_host
+from main.models import AcupointMassage, TimeSlot
+
+from .init_data import BENCH_USERNAME
+from .loadtest import latency_summary, run_load, spawned_server
+from .serve import APPLICATIONS
+
+# 各场景的请求：(名称, 是否需要登录, 期望状态码)
+JOURNEYS = [
+    ('home', False, 200),
+    ('home_logged_in', True, 200),
+    ('current_time_slot_api', False, 200),
+    ('tinnitus_helper', True, 200),
+    ('acupoint_list', False, 200),
+    ('acupoint_detail', False, 200),
+    ('tinnitus_log_list', True, 200),
+    ('tinnitus_log_create', True, 302),
+    ('reminder_settings', True, 302),
+]
+
+# HTTP 压测的路径：(名称, 路径名, 是否带登录 Cookie)
+HTTP_JOURNEYS = [
+    ('home', 'home', False),
+    ('current_time_slot_api', 'current_time_slot_api', False),
+    ('tinnitus_helper', 'tinnitus_helper', True),
+    ('acupoint_list', 'acupoint_list', False),
+    ('tinnitus_log_list', 'tinnitus_log_list', True),
+]
+
+
+class QueryCounter:
+    """统计 SQL 条数的 execute_wrapper"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = '压测主要用户场景，以 JSON 输出延迟分位数、吞吐量和 SQL 条数，可与基线对比'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50, help='每个场景用测试客户端请求的次数')
+        parser.add_argument('--warmup', type=int, default=5, help='每个场景正式计时前的预热次数')
+        parser.add_argument('--users', type=int, default=10, help='轮流使用的压测用户数（需先运行 init_data --users）')
+        parser.add_argument('--url', help='同时对该地址的运行中服务进行 HTTP 并发压测')
+        parser.add_argument('--spawn', action='store_true', help='自行启动 Gunicorn 进行 HTTP 压测（地址取 --url 或 127.0.0.1:8765）')
+        parser.add_argument('--mode', choices=sorted(APPLICATIONS), default='wsgi', help='--spawn 时的服务模式')
+        parser.add_argument('--workers', type=int, default=2, help='--spawn 时的 worker 数')
+        parser.add_argument('--concurrency', type=int, default=8, help='HTTP 压测并发连接数')
+        parser.add_argument('--seconds', type=float, default=5, help='HTTP 压测每个路径的时间（秒）')
+        parser.add_argument('--output', help='结果 JSON 写入的文件，默认输出到标准输出')
+        parser.add_argument('--baseline', help='基线 JSON 文件，结果比基线差时命令失败')
+        parser.add_argument('--tolerance', type=float, default=0.5, help='允许 p95 延迟比基线增加的比例')
+        parser.add_argument('--min-delta-ms', type=float, default=2.0, help='p95 增加不超过该毫秒数时不视为退化')
+
+    def handle(self, *args, **options):
+        users = list(
+            User.objects.filter(username__startswith=BENCH_USERNAME.format(''))
+            .order_by('id')[:options['users']]
+        )
+        if not users:
+            raise CommandError('没有压测用户，请先运行 init_data --users N --logs-per-user M --reminders')
+        slots = list(TimeSlot.objects.order_by('start_time'))
+        acupoint = AcupointMassage.objects.order_by('id').first()
+        if not slots or acupoint is None:
+            raise CommandError('缺少时辰或穴位数据，请先运行 init_data')
+
+        results = {
+            'environment': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'cpu_count': multiprocessing.cpu_count(),
+                'users': len(users),
+            },
+            'client': self.run_client(users, slots, acupoint, options),
+        }
+        if options['url'] or options['spawn']:
+            results['http'] = self.run_http(users[0], options)
+
+        output = json.dumps(results, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as file:
+                baseline = json.load(file)
+            failures = compare(baseline, results, options['tolerance'], options['min_delta_ms'])
+            if failures:
+                raise CommandError('性能退化:\n' + '\n'.join(failures))
+            self.stderr.write('与基线相比没有退化')
+
+    def run_client(self, users, slots, acupoint, options):
+        """用测试客户端在进程内依次请求各场景"""
+        host = client_host()
+        anonymous = Client(HTTP_HOST=host)
+        clients = []
+        for user in users:
+            client = Client(HTTP_HOST=host)
+            client.force_login(user)
+            clients.append(client)
+
+        requests = {
+            'home': lambda client, i: client.get(reverse('home')),
+            'home_logged_in': lambda client, i: client.get(reverse('home')),
+            'current_time_slot_api': lambda client, i: client.get(reverse('current_time_slot_api')),
+            'tinnitus_helper': lambda client, i: client.get(reverse('tinnitus_helper')),
+            'acupoint_list': lambda client, i: client.get(reverse('acupoint_list')),
+            'acupoint_detail': lambda client, i: client.get(reverse('acupoint_detail', args=[acupoint.id])),
+            'tinnitus_log_list': lambda client, i: client.get(reverse('tinnitus_log_list')),
+            'tinnitus_log_create': lambda client, i: client.post(reverse('tinnitus_log_create'), {
+                'date': time.strftime('%Y-%m-%d'),
+                'time_slot': slots[i % len(slots)].id,
+                'severity': i % 5 + 1,
+                'frequency': 'intermittent',
+                'duration_minutes': 30,
+                'notes': '压测数据',
+            }),
+            # 每次切换一个时辰的开关，保证每次都有写入
+            'reminder_settings': lambda client, i: client.post(reverse('reminder_settings'), {
+                f'reminder_{slot.id}': 'on' for index, slot in enumerate(slots) if index != i % len(slots)
+            }),
+        }
+
+        results = {}
+        for name, logged_in, expected_status in JOURNEYS:
+            request = requests[name]
+            latencies, queries, errors = [], [], 0
+            started = time.perf_counter()
+            for i in range(-options['warmup'], options['iterations']):
+                client = clients[i % len(clients)] if logged_in else anonymous
+                counter = QueryCounter()
+                request_started = time.perf_counter()
+                with connection.execute_wrapper(counter):
+                    response = request(client, i)
+                elapsed = time.perf_counter() - request_started
+                if i < 0:
+                    started = time.perf_counter()
+                    continue
+                if response.status_code != expected_status:
+                    errors += 1
+                latencies.append(elapsed)
+                queries.append(counter.count)
+            total = time.perf_counter() - started
+            results[name] = {
+                'requests': len(latencies),
+                'requests_per_second': round(len(latencies) / total, 1) if total else 0.0,
+                'errors': errors,
+                **latency_summary(latencies),
+                'queries_max': max(queries, default=0),
+                'queries_mean': round(sum(queries) / len(queries), 2) if queries else 0,
+            }
+        return results
+
+    def run_http(self, user, options):
+        """对运行中或自行启动的服务逐个路径并发压测"""
+        url = urlsplit(options['url'] or 'http://127.0.0.1:8765')
+        host, port = url.hostname or '127.0.0.1', url.port or 80
+
+        client = Client(HTTP_HOST=client_host())
+        client.force_login(user)
+        session_cookie = f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'
+
+        def run():
+            results = {}
+            for name, url_name, logged_in in HTTP_JOURNEYS:
+                headers = {'Cookie': session_cookie} if logged_in else None
+                path = reverse(url_name)
+                # 预热
+                run_load(host, port, [path], 1, 0.5, 1, headers)
+                results[name] = run_load(
+                    host, port, [path], options['concurrency'], options['seconds'],
+                    min(options['concurrency'], multiprocessing.cpu_count()), headers,
+                )
+            return results
+
+        if not options['spawn']:
+            return run()
+        with spawned_server(options['mode'], host, port, options['workers']):
+            return run()
+
+
+def compare(baseline, results, tolerance, min_delta_ms):
+    """与基线对比，返回退化项的说明"""
+    failures = []
+    for section in ('client', 'http'):
+        for name, current in results.get(section, {}).items():
+            previous = baseline.get(section, {}).get(name)
+            if not previous:
+                continue
+            if current.get('errors', 0) > previous.get('errors', 0):
+                failures.append(f'{section}.{name}: 错误数 {previous["errors"]} -> {current["errors"]}')
+            if 'queries_max' in current and current['queries_max'] > previous.get('queries_max', current['queries_max']):
+                failures.append(f'{section}.{name}: SQL 条数 {previous["queries_max"]} -> {current["queries_max"]}')
+            limit = max(previous['p95_ms'] * (1 + tolerance), previous['p95_ms'] + min_delta_ms)
+            if current['p95_ms'] > limit:
+                failures.append(f'{section}.{name}: p95 {previous["p95_ms"]} ms -> {current["p95_ms"]} ms')
+    return failures
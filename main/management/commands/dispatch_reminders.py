@@ -0,0 +1,66 @@
+import logging
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from main import reminders
+from main.time_slots import get_index
+
+logger = logging.getLogger(__name__)
+
+# 发送失败后的重试间隔（秒），每次失败翻倍，直到上限
+RETRY_DELAY = 5
+MAX_RETRY_DELAY = 300
+
+
+class Command(BaseCommand):
+    help = '常驻运行的时辰提醒调度器，在每个时辰开始时发送该时辰的提醒'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='只发送当前时辰的提醒后退出')
+        parser.add_argument('--backend', help='发送后端的导入路径，默认使用 REMINDER_DELIVERY_BACKEND')
+        parser.add_argument('--batch-size', type=int, default=reminders.DEFAULT_BATCH_SIZE, help='每批提醒数')
+        parser.add_argument('--workers', type=int, default=reminders.DEFAULT_WORKERS, help='并发发送的线程数')
+
+    def handle(self, *args, **options):
+        backend = reminders.get_backend(options['backend'])
+        self.stdout.write(f'提醒调度器已启动，发送后端：{type(backend).__name__}')
+
+        retry_delay = RETRY_DELAY
+        while True:
+            # 启动时或时辰切换后发送当前时辰；已完成的时辰会被跳过，重启不会重复发送
+            try:
+                self.dispatch_current(backend, options['batch_size'], options['workers'])
+            except Exception:
+                if options['once']:
+                    raise
+                # 进度按批次记录在检查点中，重试时从中断处继续，不会重复发送
+                logger.exception('发送提醒失败，%s 秒后重试', retry_delay)
+                close_old_connections()
+                time.sleep(retry_delay)
+                retry_delay = min(retry_delay * 2, MAX_RETRY_DELAY)
+                continue
+            retry_delay = RETRY_DELAY
+            if options['once']:
+                return
+
+            wait = get_index().seconds_until_change()
+            if wait is None:
+                self.stdout.write(self.style.WARNING('尚未初始化时辰数据，1 分钟后重试'))
+                wait = 60
+            time.sleep(wait + 1)
+
+    def dispatch_current(self, backend, batch_size, workers):
+        now = datetime.now()
+        slot = get_index().current(now)
+        if slot is None:
+            return
+        boundary = reminders.slot_boundary(slot, now)
+        started = time.monotonic()
+        dispatch = reminders.dispatch_slot(slot, boundary, backend, batch_size=batch_size, workers=workers)
+        self.stdout.write(self.style.SUCCESS(
+            f'{slot.chinese_name}（{boundary:%Y-%m-%d %H:%M}）已发送 {dispatch.sent_count} 条提醒，'
+            f'用时 {time.monotonic() - started:.2f} 秒'
+        ))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from main import images
+from main.caching import bump_content_version
+from main.models import AcupointMassage
+
+
+class Command(BaseCommand):
+    help = '为已有穴位图片生成缩略图、中图、大图的 WebP 和 JPEG 版本'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='忽略已生成的版本，全部重新生成')
+
+    def handle(self, *args, **options):
+        updated = 0
+        for acupoint in AcupointMassage.objects.exclude(image='').exclude(image__isnull=True):
+            if images.refresh_variants(acupoint, force=options['force']):
+                updated += 1
+                sizes = '、'.join(f'{variant["label"]} {variant["width"]}px' for variant in acupoint.image_variants.get('variants', []))
+                self.stdout.write(f'{acupoint.name}：{sizes or "原图不存在，已清除"}')
+        if updated:
+            bump_content_version()
+        self.stdout.write(self.style.SUCCESS(f'已处理 {updated} 张穴位图片'))
@@ -1,12 +1,28 @@
+import random
 from django.core.management.base import BaseCommand
 from django.utils import timezone
-from datetime import time
+from datetime import date, time, timedelta
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
-from main.models import TimeSlot, AcupointMassage
+from main import dashboard, search, stats
+from main.models import TimeSlot, AcupointMassage, TinnitusLog, Reminder
+
+# 压测用户的用户名及密码
+BENCH_USERNAME = 'bench_user_{}'
+BENCH_PASSWORD = 'bench12345'
+# 压测日记的症状和诱因，随机组合
+BENCH_SYMPTOMS = ['耳鸣加重', '夜间失眠', '头晕', '耳闷胀感', '听力下降', '高频嗡嗡声', '蝉鸣声', '心烦易怒', '早醒多梦']
+BENCH_TRIGGERS = ['熬夜', '喝咖啡', '噪音环境', '工作压力大', '感冒', '饮酒', '长时间戴耳机', '天气变化']
 
 
 class Command(BaseCommand):
-    help = '初始化十二时辰数据、穴位数据和管理员用户'
+    help = '初始化十二时辰数据、穴位数据和管理员用户，可选生成压测用户及日记'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=0, help='生成的压测用户数（bench_user_0 起）')
+        parser.add_argument('--logs-per-user', type=int, default=0, help='每个新压测用户的日记条数')
+        parser.add_argument('--reminders', action='store_true', help='为新压测用户开启全部十二时辰提醒')
+        parser.add_argument('--seed', type=int, default=0, help='生成日记内容的随机种子')
 
     def handle(self, *args, **options):
         self.stdout.write('开始初始化数据...')
@@ -20,6 +36,10 @@ class Command(BaseCommand):
         # 初始化穴位数据
         self.init_acupoints()
         
+        # 压测数据
+        if options['users']:
+            self.init_bench_users(options['users'], options['logs_per_user'], options['reminders'], options['seed'])
+        
         self.stdout.write(self.style.SUCCESS('数据初始化完成！'))
 
     def init_admin_user(self):
@@ -288,4 +308,55 @@ class Command(BaseCommand):
                     acupoint.save()
                     self.stdout.write(f'更新穴位: {acupoint.name}')
                 else:
-                    self.stdout.write(f'穴位未更新: {acupoint.name}')
\ No newline at end of file
+                    self.stdout.write(f'穴位未更新: {acupoint.name}')
+
+    def init_bench_users(self, count, logs_per_user, reminders, seed):
+        """批量生成压测用户及其日记、提醒，已存在的用户不重复生成"""
+        usernames = [BENCH_USERNAME.format(i) for i in range(count)]
+        existing = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+        password = make_password(BENCH_PASSWORD)
+        User.objects.bulk_create(
+            [User(username=name, password=password) for name in usernames if name not in existing],
+            batch_size=1000,
+        )
+        users = list(User.objects.filter(username__in=set(usernames) - existing).values_list('id', flat=True))
+        self.stdout.write(f'压测用户: 新建 {len(users)} 个，已存在 {len(existing)} 个')
+        if not users:
+            return
+
+        slots = list(TimeSlot.objects.order_by('start_time'))
+        if reminders:
+            Reminder.objects.bulk_create(
+                [Reminder(user_id=user_id, time_slot=slot) for user_id in users for slot in slots],
+                batch_size=1000, ignore_conflicts=True,
+            )
+            self.stdout.write(f'压测提醒: {len(users) * len(slots)} 条')
+
+        if logs_per_user:
+            rng = random.Random(seed)
+            today = date.today()
+            # 每天约 3 条，日期从今天往前排
+            days = max(1, logs_per_user // 3)
+            frequencies = [value for value, _ in TinnitusLog.FREQUENCY_CHOICES]
+            for user_id in users:
+                logs = TinnitusLog.objects.bulk_create([
+                    TinnitusLog(
+                        user_id=user_id,
+                        date=today - timedelta(days=i * days // logs_per_user),
+                        time_slot=slots[rng.randrange(len(slots))],
+                        severity=rng.randint(1, 5),
+                        frequency=rng.choice(frequencies),
+                        duration_minutes=rng.randint(5, 240),
+                        sleep_quality=rng.choice([None, *range(1, 11)]),
+                        symptoms='，'.join(rng.sample(BENCH_SYMPTOMS, rng.randint(1, 3))),
+                        triggers='、'.join(rng.sample(BENCH_TRIGGERS, rng.randint(0, 2))),
+                        notes='压测数据',
+                    )
+                    for i in range(logs_per_user)
+                ], batch_size=1000)
+                # bulk_create 不触发信号，统一更新全文索引并重建每日汇总
+                search.index_logs(logs)
+                stats.rebuild_range(user_id, today - timedelta(days=days), today)
+            self.stdout.write(f'压测日记: {len(users) * logs_per_user} 条')
+        # 新用户可能沿用已删除用户的 ID，清除其残留的助手页快照
+        dashboard.invalidate(users)
\ No newline at end of file
@@ -0,0 +1,158 @@
+import http.client
+import multiprocessing
+import signal
+import socket
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main.benchmarks import percentile
+
+from .serve import APPLICATIONS, gunicorn_command
+
+DEFAULT_PATHS = ['/', '/acupoints/', '/api/current-time-slot/']
+
+
+def _client_process(host, port, paths, connections, seconds, headers=None):
+    """在一个进程中用多个线程、各自保持一个长连接循环发送请求"""
+    deadline = time.monotonic() + seconds
+    results = []
+    lock = threading.Lock()
+
+    def run(offset):
+        conn = http.client.HTTPConnection(host, port, timeout=30)
+        count, errors, latencies = 0, 0, []
+        while time.monotonic() < deadline:
+            path = paths[(offset + count + errors) % len(paths)]
+            started = time.monotonic()
+            try:
+                conn.request('GET', path, headers=headers or {})
+                response = conn.getresponse()
+                response.read()
+            except (OSError, http.client.HTTPException):
+                errors += 1
+                conn.close()
+                conn = http.client.HTTPConnection(host, port, timeout=30)
+                continue
+            if response.status == 200:
+                count += 1
+                latencies.append(time.monotonic() - started)
+            else:
+                errors += 1
+        conn.close()
+        with lock:
+            results.append((count, errors, latencies))
+
+    threads = [threading.Thread(target=run, args=(offset,)) for offset in range(connections)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return (
+        sum(result[0] for result in results),
+        sum(result[1] for result in results),
+        [latency for result in results for latency in result[2]],
+    )
+
+
+def latency_summary(latencies):
+    """各分位延迟（毫秒）"""
+    return {
+        f'p{round(fraction * 100)}_ms': round(percentile(latencies, fraction) * 1000, 3)
+        for fraction in (0.5, 0.95, 0.99)
+    }
+
+
+def run_load(host, port, paths, concurrency, seconds, processes, headers=None):
+    """并发请求并返回吞吐量、错误数及 p50/p95/p99 延迟"""
+    processes = max(1, min(processes, concurrency))
+    per_process = [concurrency // processes + (1 if i < concurrency % processes else 0) for i in range(processes)]
+    started = time.monotonic()
+    with multiprocessing.Pool(processes) as pool:
+        results = pool.starmap(
+            _client_process, [(host, port, paths, count, seconds, headers) for count in per_process]
+        )
+    elapsed = time.monotonic() - started
+    requests = sum(result[0] for result in results)
+    errors = sum(result[1] for result in results)
+    latencies = [latency for result in results for latency in result[2]]
+    return {
+        'requests': requests,
+        'requests_per_second': round(requests / elapsed, 1),
+        'errors': errors,
+        **latency_summary(latencies),
+    }
+
+
+def wait_for_port(host, port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection((host, port), timeout=1).close()
+            return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+@contextmanager
+def spawned_server(mode, host, port, workers):
+    """在后台启动 Gunicorn，退出时平滑关闭"""
+    argv, env = gunicorn_command(mode, f'{host}:{port}', workers, access_log=False)
+    server = subprocess.Popen(argv, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        if not wait_for_port(host, port):
+            raise CommandError('Gunicorn 未能在 30 秒内启动')
+        yield server
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=60)
+
+
+class Command(BaseCommand):
+    help = '对运行中的服务或自行启动的不同 worker 数的 Gunicorn 服务进行压测'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='压测地址（不含路径）')
+        parser.add_argument('--path', action='append', dest='paths', help='请求路径，可多次指定，默认首页、穴位列表和时辰接口')
+        parser.add_argument('--concurrency', type=int, default=32, help='并发连接数')
+        parser.add_argument('--seconds', type=float, default=10, help='每轮压测时间（秒）')
+        parser.add_argument('--client-processes', type=int, default=multiprocessing.cpu_count(), help='压测客户端进程数')
+        parser.add_argument('--spawn', action='store_true', help='自行启动 Gunicorn，依次使用 --workers 中的进程数')
+        parser.add_argument('--workers', default='1,2,4', help='--spawn 时的 worker 数列表，逗号分隔')
+        parser.add_argument('--mode', choices=sorted(APPLICATIONS), default='wsgi', help='--spawn 时的服务模式')
+
+    def handle(self, *args, **options):
+        url = urlsplit(options['url'])
+        host, port = url.hostname or '127.0.0.1', url.port or 80
+        paths = options['paths'] or DEFAULT_PATHS
+
+        self.stdout.write(
+            f'并发 {options["concurrency"]}，每轮 {options["seconds"]} 秒，核数 {multiprocessing.cpu_count()}，'
+            f'路径 {", ".join(paths)}'
+        )
+        self.stdout.write(f'{"workers":>8}{"请求/秒":>12}{"p50(ms)":>10}{"p95(ms)":>10}{"p99(ms)":>10}{"错误":>8}')
+
+        if not options['spawn']:
+            self.report('-', run_load(
+                host, port, paths, options['concurrency'], options['seconds'], options['client_processes']
+            ))
+            return
+
+        for workers in [int(value) for value in options['workers'].split(',')]:
+            with spawned_server(options['mode'], host, port, workers):
+                # 预热：每个 worker 完成首次加载
+                run_load(host, port, paths, workers, 1, 1)
+                self.report(workers, run_load(
+                    host, port, paths, options['concurrency'], options['seconds'], options['client_processes']
+                ))
+
+    def report(self, workers, result):
+        self.stdout.write(
+            f'{workers:>8}{result["requests_per_second"]:>12.1f}{result["p50_ms"]:>10.1f}'
+            f'{result["p95_ms"]:>10.1f}{result["p99_ms"]:>10.1f}{result["errors"]:>8}'
+        )
@@ -0,0 +1,54 @@
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.sessions.backends.db import SessionStore as DatabaseSessionStore
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+DEFAULT_BATCH_SIZE = 500
+
+
+def purge_expired(model, batch_size, pause=0.0, max_batches=None):
+    """分批删除过期会话，每批是一条短事务，批次之间让出写锁；返回删除的条数"""
+    now = timezone.now()
+    deleted = batches = 0
+    while max_batches is None or batches < max_batches:
+        keys = list(
+            model.objects.filter(expire_date__lt=now).order_by('expire_date')
+            .values_list('session_key', flat=True)[:batch_size]
+        )
+        if not keys:
+            break
+        deleted += model.objects.filter(session_key__in=keys).delete()[0]
+        batches += 1
+        if len(keys) < batch_size:
+            break
+        if pause:
+            time.sleep(pause)
+    return deleted
+
+
+class Command(BaseCommand):
+    help = '分批清理数据库中的过期会话，可由 cron 定时运行或加 --interval 常驻运行'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='每批删除的会话数')
+        parser.add_argument('--pause', type=float, default=0.05, help='批次之间的间隔（秒）')
+        parser.add_argument('--max-batches', type=int, help='本次最多删除的批数，剩余的留到下次')
+        parser.add_argument('--interval', type=float, help='常驻运行，每隔该秒数清理一次')
+
+    def handle(self, *args, **options):
+        store = import_module(settings.SESSION_ENGINE).SessionStore
+        if not issubclass(store, DatabaseSessionStore):
+            self.stdout.write('当前会话后端不使用数据库，无需清理')
+            return
+        model = store.get_model_class()
+
+        while True:
+            started = time.monotonic()
+            deleted = purge_expired(model, options['batch_size'], options['pause'], options['max_batches'])
+            self.stdout.write(f'已删除 {deleted} 条过期会话，用时 {time.monotonic() - started:.2f} 秒')
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
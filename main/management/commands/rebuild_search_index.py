@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from main import search
+from main.models import AcupointMassage, TinnitusLog
+
+
+class Command(BaseCommand):
+    help = '清空并重建穴位和日记的全文索引（绕过信号批量写入数据后使用）'
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        with transaction.atomic():
+            search.rebuild(AcupointMassage.objects.all(), TinnitusLog.objects.all())
+        self.stdout.write(self.style.SUCCESS(
+            f'已索引 {AcupointMassage.objects.count()} 个穴位、{TinnitusLog.objects.count()} 条日记，'
+            f'用时 {time.monotonic() - started:.1f} 秒'
+        ))
@@ -0,0 +1,52 @@
+import os
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+APPLICATIONS = {
+    'asgi': 'tinnitus_health.asgi:application',
+    'wsgi': 'tinnitus_health.wsgi:application',
+}
+
+
+def gunicorn_command(mode='wsgi', bind=None, workers=None, access_log=True):
+    """返回启动 Gunicorn 的命令行和环境变量"""
+    argv = [
+        sys.executable, '-m', 'gunicorn',
+        '-c', str(settings.BASE_DIR / 'gunicorn.conf.py'),
+        '--chdir', str(settings.BASE_DIR),
+    ]
+    if bind:
+        argv += ['--bind', bind]
+    if workers:
+        argv += ['--workers', str(workers)]
+    if not access_log:
+        argv += ['--access-logfile', '/dev/null']
+    argv.append(APPLICATIONS[mode])
+    # 沿用当前的 DJANGO_SETTINGS_MODULE（可通过 --settings 指定）
+    env = {**os.environ, 'GUNICORN_MODE': mode}
+    return argv, env
+
+
+class Command(BaseCommand):
+    help = '以 Gunicorn 多进程方式启动生产服务（配置见 gunicorn.conf.py）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', choices=sorted(APPLICATIONS), default='wsgi', help='WSGI（默认）或 ASGI（支持事件推送）')
+        parser.add_argument('--bind', help='监听地址，默认 GUNICORN_BIND 或 0.0.0.0:8000')
+        parser.add_argument('--workers', type=int, help='worker 进程数，默认 2 * 核数 + 1')
+        parser.add_argument('--no-access-log', action='store_true', help='不输出访问日志')
+
+    def handle(self, *args, **options):
+        if settings.DEBUG:
+            self.stderr.write(self.style.WARNING(
+                '当前配置开启了 DEBUG，生产环境请使用 --settings=tinnitus_health.settings_prod'
+            ))
+        argv, env = gunicorn_command(
+            options['mode'], options['bind'], options['workers'], not options['no_access_log']
+        )
+        self.stdout.write(' '.join(argv[1:]))
+        self.stdout.flush()
+        # 由 Gunicorn 主进程取代当前进程，便于进程管理器直接发送 HUP/TERM 信号
+        os.execvpe(argv[0], argv, env)
@@ -0,0 +1,223 @@
+"""请求耗时、SQL 和模板渲染统计
+
+MetricsMiddleware 为每个请求在 ContextVar 中放一个计数对象，
+数据库连接上常驻的 execute_wrapper 和 DjangoTemplates 后端分别把 SQL 和模板渲染耗时记到其中，
+请求结束后按 URL 名称累加到进程内的计数器，由 /metrics 以 Prometheus 文本格式输出。
+计数器只在本进程内累加、不加锁，多线程下极少数增量可能丢失，可接受；
+多个 worker 进程各自统计，抓取到的是处理该次请求的进程的数据。
+超过 METRICS_SLOW_REQUEST_SECONDS 的请求连同其 SQL 列表写入 main.metrics 日志。
+"""
+import logging
+import os
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.template.backends import django as django_backend
+
+from . import middleware
+
+logger = logging.getLogger(__name__)
+
+# 请求耗时直方图的区间上限（秒）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# 每个请求最多保留的 SQL 条数，用于慢请求日志
+MAX_LOGGED_QUERIES = 100
+UNMATCHED_VIEW = '<unmatched>'
+
+_current = ContextVar('request_metrics', default=None)
+_started_at = time.time()
+
+
+class RequestStats:
+    __slots__ = ('queries', 'sql_seconds', 'template_seconds', 'query_log')
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+        self.query_log = []
+
+
+class ViewStats:
+    """单个 URL 名称的累计数据"""
+    __slots__ = ('buckets', 'seconds', 'requests', 'queries', 'sql_seconds', 'template_seconds')
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.seconds = 0.0
+        self.requests = 0
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+
+    def add(self, elapsed, stats):
+        self.buckets[bisect_left(LATENCY_BUCKETS, elapsed)] += 1
+        self.seconds += elapsed
+        self.requests += 1
+        self.queries += stats.queries
+        self.sql_seconds += stats.sql_seconds
+        self.template_seconds += stats.template_seconds
+
+
+# URL 名称 -> ViewStats；(URL 名称, 方法, 状态码) -> 请求数
+view_stats = defaultdict(ViewStats)
+response_counts = defaultdict(int)
+
+
+def reset():
+    view_stats.clear()
+    response_counts.clear()
+
+
+def record_query(execute, sql, params, many, context):
+    """常驻在每个数据库连接上的 execute_wrapper"""
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        stats.queries += 1
+        stats.sql_seconds += elapsed
+        if len(stats.query_log) < MAX_LOGGED_QUERIES:
+            stats.query_log.append((elapsed, sql))
+
+
+def instrument_connection(connection):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+class Template(django_backend.Template):
+
+    def render(self, context=None, request=None):
+        stats = _current.get()
+        if stats is None:
+            return super().render(context, request)
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            stats.template_seconds += time.perf_counter() - started
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """记录模板渲染耗时的 DjangoTemplates 后端"""
+
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return Template(super().get_template(template_name).template, self)
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        self.slow_seconds = getattr(settings, 'METRICS_SLOW_REQUEST_SECONDS', 1.0)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.record(request, response, stats, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.record(request, response, stats, time.perf_counter() - started)
+        return response
+
+    def record(self, request, response, stats, elapsed):
+        match = request.resolver_match
+        view = match.view_name if match else UNMATCHED_VIEW
+        view_stats[view].add(elapsed, stats)
+        response_counts[view, request.method, response.status_code] += 1
+        if elapsed >= self.slow_seconds:
+            log_slow_request(request, view, elapsed, stats)
+
+
+def log_slow_request(request, view, elapsed, stats):
+    lines = [f'{duration * 1000:8.1f} ms  {sql}' for duration, sql in stats.query_log]
+    if stats.queries > len(stats.query_log):
+        lines.append(f'……另有 {stats.queries - len(stats.query_log)} 条')
+    logger.warning(
+        '慢请求 %s %s (%s) %.0f ms，SQL %d 条 %.0f ms，模板 %.0f ms\n%s',
+        request.method, request.get_full_path(), view, elapsed * 1000,
+        stats.queries, stats.sql_seconds * 1000, stats.template_seconds * 1000, '\n'.join(lines),
+    )
+
+
+def _labels(**labels):
+    pairs = ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels.items()
+    )
+    return '{' + pairs + '}'
+
+
+def render_prometheus():
+    """Prometheus 文本格式"""
+    lines = [
+        '# HELP tinnitus_process_start_time_seconds Start time of this worker process.',
+        '# TYPE tinnitus_process_start_time_seconds gauge',
+        f'tinnitus_process_start_time_seconds{_labels(pid=os.getpid())} {_started_at:.3f}',
+        '# HELP tinnitus_http_responses_total Responses by URL name, method and status.',
+        '# TYPE tinnitus_http_responses_total counter',
+    ]
+    for (view, method, status), count in sorted(response_counts.copy().items()):
+        lines.append(f'tinnitus_http_responses_total{_labels(view=view, method=method, status=status)} {count}')
+
+    views = sorted(view_stats.copy().items())
+    lines += [
+        '# HELP tinnitus_http_request_duration_seconds Request latency by URL name.',
+        '# TYPE tinnitus_http_request_duration_seconds histogram',
+    ]
+    for view, item in views:
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), item.buckets):
+            cumulative += count
+            lines.append(f'tinnitus_http_request_duration_seconds_bucket{_labels(view=view, le=bound)} {cumulative}')
+        lines.append(f'tinnitus_http_request_duration_seconds_sum{_labels(view=view)} {item.seconds:.6f}')
+        lines.append(f'tinnitus_http_request_duration_seconds_count{_labels(view=view)} {item.requests}')
+
+    for name, attribute, help_text in [
+        ('tinnitus_sql_queries_total', 'queries', 'SQL queries executed by URL name.'),
+        ('tinnitus_sql_duration_seconds_total', 'sql_seconds', 'Time spent in SQL by URL name.'),
+        ('tinnitus_template_render_seconds_total', 'template_seconds', 'Time spent rendering templates by URL name.'),
+    ]:
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+        for view, item in views:
+            lines.append(f'{name}{_labels(view=view)} {getattr(item, attribute)}')
+
+    lines += [
+        '# HELP tinnitus_scanner_blocked_total Requests rejected by ScannerBlockMiddleware.',
+        '# TYPE tinnitus_scanner_blocked_total counter',
+    ]
+    for reason, count in sorted(middleware.blocked_counts.copy().items()):
+        lines.append(f'tinnitus_scanner_blocked_total{_labels(reason=reason)} {count}')
+    return '\n'.join(lines) + '\n'
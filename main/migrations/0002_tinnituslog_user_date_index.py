@@ -0,0 +1,24 @@
+# Generated by Django 5.2.4 on 2026-10-19 00:14
+
+from django.conf import settings
+from django.db import migrations, models
+
+import main.operations
+
+
+class Migration(migrations.Migration):
+
+    # PostgreSQL 上并发建索引，不能在事务中执行
+    atomic = False
+
+    dependencies = [
+        ('main', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        main.operations.AddIndexConcurrently(
+            model_name='tinnituslog',
+            index=models.Index(fields=['user', '-date', '-created_at'], name='main_tinnitus_user_date_idx'),
+        ),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 5.2.4 on 2026-10-19 00:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, Sum
+
+
+def build_aggregates(apps, schema_editor):
+    """根据已有日记生成每日汇总"""
+    TinnitusLog = apps.get_model('main', 'TinnitusLog')
+    TinnitusDailyAggregate = apps.get_model('main', 'TinnitusDailyAggregate')
+    rows = (
+        TinnitusLog.objects
+        .values('user_id', 'date', 'time_slot__name')
+        .annotate(
+            log_count=Count('id'),
+            severity_sum=Sum('severity'),
+            severity_max=Max('severity'),
+            duration_sum=Sum('duration_minutes'),
+            sleep_quality_sum=Sum('sleep_quality'),
+            sleep_quality_count=Count('sleep_quality'),
+        )
+        .order_by()
+    )
+    TinnitusDailyAggregate.objects.bulk_create(
+        (
+            TinnitusDailyAggregate(
+                user_id=row['user_id'],
+                date=row['date'],
+                slot_name=row['time_slot__name'] or '',
+                log_count=row['log_count'],
+                severity_sum=row['severity_sum'],
+                severity_max=row['severity_max'],
+                duration_sum=row['duration_sum'],
+                sleep_quality_sum=row['sleep_quality_sum'] or 0,
+                sleep_quality_count=row['sleep_quality_count'],
+            )
+            for row in rows.iterator()
+        ),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0002_tinnituslog_user_date_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TinnitusDailyAggregate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='日期')),
+                ('slot_name', models.CharField(blank=True, choices=[('zi', '子时 (23:00-01:00)'), ('chou', '丑时 (01:00-03:00)'), ('yin', '寅时 (03:00-05:00)'), ('mao', '卯时 (05:00-07:00)'), ('chen', '辰时 (07:00-09:00)'), ('si', '巳时 (09:00-11:00)'), ('wu', '午时 (11:00-13:00)'), ('wei', '未时 (13:00-15:00)'), ('shen', '申时 (15:00-17:00)'), ('you', '酉时 (17:00-19:00)'), ('xu', '戌时 (19:00-21:00)'), ('hai', '亥时 (21:00-23:00)')], max_length=10, verbose_name='时辰')),
+                ('log_count', models.PositiveIntegerField(default=0, verbose_name='记录数')),
+                ('severity_sum', models.PositiveIntegerField(default=0, verbose_name='严重程度合计')),
+                ('severity_max', models.PositiveSmallIntegerField(default=0, verbose_name='最高严重程度')),
+                ('duration_sum', models.PositiveIntegerField(default=0, verbose_name='持续时间合计(分钟)')),
+                ('sleep_quality_sum', models.PositiveIntegerField(default=0, verbose_name='睡眠质量合计')),
+                ('sleep_quality_count', models.PositiveIntegerField(default=0, verbose_name='睡眠质量记录数')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='用户')),
+            ],
+            options={
+                'verbose_name': '耳鸣日记汇总',
+                'verbose_name_plural': '耳鸣日记汇总',
+                'ordering': ['-date', 'slot_name'],
+                'unique_together': {('user', 'date', 'slot_name')},
+            },
+        ),
+        migrations.RunPython(build_aggregates, migrations.RunPython.noop),
+    ]
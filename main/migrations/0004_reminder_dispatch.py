@@ -0,0 +1,69 @@
+# Generated by Django 5.2.4 on 2026-10-19 00:21
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0003_tinnitusdailyaggregate'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReminderDispatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('boundary', models.DateTimeField(verbose_name='时辰开始时间')),
+                ('last_reminder_id', models.BigIntegerField(default=0, verbose_name='已发送的最大提醒ID')),
+                ('sent_count', models.PositiveIntegerField(default=0, verbose_name='已发送数')),
+                ('started_at', models.DateTimeField(auto_now_add=True, verbose_name='开始时间')),
+                ('completed_at', models.DateTimeField(blank=True, null=True, verbose_name='完成时间')),
+            ],
+            options={
+                'verbose_name': '提醒发送记录',
+                'verbose_name_plural': '提醒发送记录',
+                'ordering': ['-boundary'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ReminderMessage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content', models.TextField(verbose_name='提醒内容')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('read_at', models.DateTimeField(blank=True, null=True, verbose_name='阅读时间')),
+            ],
+            options={
+                'verbose_name': '提醒消息',
+                'verbose_name_plural': '提醒消息',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='reminderdispatch',
+            name='time_slot',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='main.timeslot', verbose_name='时辰'),
+        ),
+        migrations.AddField(
+            model_name='remindermessage',
+            name='time_slot',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='main.timeslot', verbose_name='时辰'),
+        ),
+        migrations.AddField(
+            model_name='remindermessage',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='用户'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='reminderdispatch',
+            unique_together={('time_slot', 'boundary')},
+        ),
+        migrations.AddIndex(
+            model_name='remindermessage',
+            index=models.Index(fields=['user', '-created_at'], name='main_remindermsg_user_idx'),
+        ),
+    ]
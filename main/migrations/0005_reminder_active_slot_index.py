@@ -0,0 +1,24 @@
+from django.db import migrations, models
+
+import main.operations
+
+
+class Migration(migrations.Migration):
+
+    # PostgreSQL 上并发建索引，不能在事务中执行
+    atomic = False
+
+    dependencies = [
+        ('main', '0004_reminder_dispatch'),
+    ]
+
+    operations = [
+        main.operations.AddIndexConcurrently(
+            model_name='reminder',
+            index=models.Index(
+                condition=models.Q(('is_active', True)),
+                fields=['time_slot', 'id'],
+                name='main_reminder_active_slot_idx',
+            ),
+        ),
+    ]
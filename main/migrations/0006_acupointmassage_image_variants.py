@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 00:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0005_reminder_active_slot_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='acupointmassage',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='图片尺寸版本'),
+        ),
+    ]
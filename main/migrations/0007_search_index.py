@@ -0,0 +1,103 @@
+import re
+
+from django.db import migrations
+
+# 建表语句和分词规则固定在迁移中，与 main.search 此后的修改无关
+CREATE_SQL = {
+    'sqlite': [
+        "CREATE VIRTUAL TABLE main_acupoint_fts USING fts5(name, location, benefits, tokenize='unicode61')",
+        "CREATE VIRTUAL TABLE main_tinnitus_log_fts USING fts5(owner, body, tokenize='unicode61')",
+    ],
+    'postgresql': [
+        'CREATE TABLE main_acupoint_search ('
+        'acupoint_id bigint PRIMARY KEY REFERENCES main_acupointmassage (id) ON DELETE CASCADE, '
+        'document tsvector NOT NULL)',
+        'CREATE INDEX main_acupoint_search_doc_idx ON main_acupoint_search USING gin (document)',
+        'CREATE TABLE main_tinnitus_log_search ('
+        'log_id bigint PRIMARY KEY REFERENCES main_tinnituslog (id) ON DELETE CASCADE, '
+        'user_id integer NOT NULL, document tsvector NOT NULL)',
+        'CREATE INDEX main_tinnitus_log_search_doc_idx ON main_tinnitus_log_search USING gin (document)',
+        'CREATE INDEX main_tinnitus_log_search_user_idx ON main_tinnitus_log_search (user_id)',
+    ],
+}
+DROP_SQL = {
+    'sqlite': ['DROP TABLE IF EXISTS main_acupoint_fts', 'DROP TABLE IF EXISTS main_tinnitus_log_fts'],
+    'postgresql': ['DROP TABLE IF EXISTS main_acupoint_search', 'DROP TABLE IF EXISTS main_tinnitus_log_search'],
+}
+INSERT_ACUPOINT_SQL = {
+    'sqlite': 'INSERT INTO main_acupoint_fts (rowid, name, location, benefits) VALUES (%s, %s, %s, %s)',
+    'postgresql': (
+        'INSERT INTO main_acupoint_search (acupoint_id, document) VALUES (%s, '
+        "setweight(to_tsvector('simple', %s), 'A') || setweight(to_tsvector('simple', %s), 'B') "
+        "|| setweight(to_tsvector('simple', %s), 'C'))"
+    ),
+}
+INSERT_LOG_SQL = {
+    'sqlite': 'INSERT INTO main_tinnitus_log_fts (rowid, owner, body) VALUES (%s, %s, %s)',
+    'postgresql': (
+        "INSERT INTO main_tinnitus_log_search (log_id, user_id, document) VALUES (%s, %s, to_tsvector('simple', %s))"
+    ),
+}
+ACUPOINT_FIELDS = ['name', 'location_description', 'benefits']
+LOG_FIELDS = ['symptoms', 'triggers', 'massage_points', 'massage_effect', 'mood', 'notes']
+BATCH_SIZE = 2000
+
+_RUN_RE = re.compile('[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+|[0-9a-z]+')
+
+
+def tokenize(text):
+    """汉字切成相邻两字的词加末字，字母数字按单词切分"""
+    tokens = []
+    for run in _RUN_RE.findall((text or '').lower()):
+        if run[0] >= '\u3400':
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+            tokens.append(run[-1])
+        else:
+            tokens.append(run)
+    return ' '.join(tokens)
+
+
+def create_search_index(apps, schema_editor):
+    """建立全文索引表并索引已有穴位和日记"""
+    connection = schema_editor.connection
+    vendor = connection.vendor
+    if vendor not in CREATE_SQL:
+        return
+    for sql in CREATE_SQL[vendor]:
+        schema_editor.execute(sql)
+
+    AcupointMassage = apps.get_model('main', 'AcupointMassage')
+    TinnitusLog = apps.get_model('main', 'TinnitusLog')
+    acupoints = AcupointMassage.objects.using(connection.alias).values_list('pk', *ACUPOINT_FIELDS)
+    logs = TinnitusLog.objects.using(connection.alias).values_list('pk', 'user_id', *LOG_FIELDS).order_by('pk')
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            INSERT_ACUPOINT_SQL[vendor],
+            [(pk, *(tokenize(value) for value in values)) for pk, *values in acupoints],
+        )
+        last_pk = 0
+        while True:
+            batch = list(logs.filter(pk__gt=last_pk)[:BATCH_SIZE])
+            if not batch:
+                break
+            rows = [(pk, user_id, ' '.join(tokenize(value) for value in values)) for pk, user_id, *values in batch]
+            if vendor == 'sqlite':
+                rows = [(pk, f'u{user_id}', body) for pk, user_id, body in rows]
+            cursor.executemany(INSERT_LOG_SQL[vendor], rows)
+            last_pk = batch[-1][0]
+
+
+def drop_search_index(apps, schema_editor):
+    for sql in DROP_SQL.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0006_acupointmassage_image_variants'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,32 @@
+from django.db import migrations, models
+
+import main.operations
+
+
+class Migration(migrations.Migration):
+
+    # PostgreSQL 上并发建索引，不能在事务中执行
+    atomic = False
+
+    dependencies = [
+        ('main', '0007_search_index'),
+    ]
+
+    operations = [
+        main.operations.AddIndexConcurrently(
+            model_name='tinnituslog',
+            index=models.Index(fields=['-date', '-id'], name='main_tinnitus_date_id_idx'),
+        ),
+        main.operations.AddIndexConcurrently(
+            model_name='tinnituslog',
+            index=models.Index(fields=['severity', '-date', '-id'], name='main_tinnitus_sev_date_idx'),
+        ),
+        main.operations.AddIndexConcurrently(
+            model_name='tinnituslog',
+            index=models.Index(fields=['frequency', '-date', '-id'], name='main_tinnitus_freq_date_idx'),
+        ),
+        main.operations.AddIndexConcurrently(
+            model_name='tinnituslog',
+            index=models.Index(fields=['time_slot', '-date', '-id'], name='main_tinnitus_slot_date_idx'),
+        ),
+    ]
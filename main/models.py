@@ -2,6 +2,8 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
 
+from . import images
+
 
 class TimeSlot(models.Model):
     """十二时辰模型"""
@@ -78,11 +80,50 @@ class TinnitusLog(models.Model):
         verbose_name = '耳鸣日记'
         verbose_name_plural = '耳鸣日记'
         ordering = ['-date', '-created_at']
+        indexes = [
+            models.Index(fields=['user', '-date', '-created_at'], name='main_tinnitus_user_date_idx'),
+            # 管理后台按日期倒序游标翻页，以及各筛选项筛选后的翻页
+            models.Index(fields=['-date', '-id'], name='main_tinnitus_date_id_idx'),
+            models.Index(fields=['severity', '-date', '-id'], name='main_tinnitus_sev_date_idx'),
+            models.Index(fields=['frequency', '-date', '-id'], name='main_tinnitus_freq_date_idx'),
+            models.Index(fields=['time_slot', '-date', '-id'], name='main_tinnitus_slot_date_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.date} - 严重程度{self.severity}"
 
 
+class TinnitusDailyAggregate(models.Model):
+    """耳鸣日记每日汇总（按用户、日期、时辰），随日记的增删改增量维护"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name='用户')
+    date = models.DateField(verbose_name='日期')
+    slot_name = models.CharField(max_length=10, choices=TimeSlot.TIME_CHOICES, blank=True, verbose_name='时辰')
+    log_count = models.PositiveIntegerField(default=0, verbose_name='记录数')
+    severity_sum = models.PositiveIntegerField(default=0, verbose_name='严重程度合计')
+    severity_max = models.PositiveSmallIntegerField(default=0, verbose_name='最高严重程度')
+    duration_sum = models.PositiveIntegerField(default=0, verbose_name='持续时间合计(分钟)')
+    sleep_quality_sum = models.PositiveIntegerField(default=0, verbose_name='睡眠质量合计')
+    sleep_quality_count = models.PositiveIntegerField(default=0, verbose_name='睡眠质量记录数')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='更新时间')
+    
+    class Meta:
+        verbose_name = '耳鸣日记汇总'
+        verbose_name_plural = '耳鸣日记汇总'
+        unique_together = ['user', 'date', 'slot_name']
+        ordering = ['-date', 'slot_name']
+    
+    def __str__(self):
+        return f"{self.user_id} - {self.date} - {self.slot_name or '未记录时辰'}"
+    
+    @property
+    def severity_avg(self):
+        return self.severity_sum / self.log_count if self.log_count else None
+    
+    @property
+    def sleep_quality_avg(self):
+        return self.sleep_quality_sum / self.sleep_quality_count if self.sleep_quality_count else None
+
+
 class Reminder(models.Model):
     """时辰提醒模型"""
     user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name='用户')
@@ -96,11 +137,56 @@ class Reminder(models.Model):
         verbose_name = '时辰提醒'
         verbose_name_plural = '时辰提醒'
         unique_together = ['user', 'time_slot']
+        indexes = [
+            # 只索引有效提醒，按时辰发送时按 id 顺序分批读取
+            models.Index(
+                fields=['time_slot', 'id'], condition=models.Q(is_active=True), name='main_reminder_active_slot_idx'
+            ),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.time_slot.chinese_name} 提醒"
 
 
+class ReminderMessage(models.Model):
+    """站内提醒消息（提醒发送的站内信箱）"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name='用户')
+    time_slot = models.ForeignKey(TimeSlot, on_delete=models.CASCADE, verbose_name='时辰')
+    content = models.TextField(verbose_name='提醒内容')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
+    read_at = models.DateTimeField(null=True, blank=True, verbose_name='阅读时间')
+    
+    class Meta:
+        verbose_name = '提醒消息'
+        verbose_name_plural = '提醒消息'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='main_remindermsg_user_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user_id} - {self.time_slot_id} - {self.created_at}"
+
+
+class ReminderDispatch(models.Model):
+    """提醒发送记录，按 ID 顺序记录发送进度，重启后从断点继续，不会重复发送"""
+    time_slot = models.ForeignKey(TimeSlot, on_delete=models.CASCADE, verbose_name='时辰')
+    boundary = models.DateTimeField(verbose_name='时辰开始时间')
+    last_reminder_id = models.BigIntegerField(default=0, verbose_name='已发送的最大提醒ID')
+    sent_count = models.PositiveIntegerField(default=0, verbose_name='已发送数')
+    started_at = models.DateTimeField(auto_now_add=True, verbose_name='开始时间')
+    completed_at = models.DateTimeField(null=True, blank=True, verbose_name='完成时间')
+    
+    class Meta:
+        verbose_name = '提醒发送记录'
+        verbose_name_plural = '提醒发送记录'
+        unique_together = ['time_slot', 'boundary']
+        ordering = ['-boundary']
+    
+    def __str__(self):
+        return f"{self.time_slot_id} - {self.boundary}"
+
+
 class AcupointMassage(models.Model):
     """穴位按摩记录模型"""
     BODY_PARTS = [
@@ -119,6 +205,8 @@ class AcupointMassage(models.Model):
     benefits = models.TextField(verbose_name='功效说明')
     related_time_slots = models.ManyToManyField(TimeSlot, blank=True, verbose_name='相关时辰')
     image = models.ImageField(upload_to='acupoints/', blank=True, null=True, verbose_name='穴位图片')
+    # 由 main.images 生成的各档尺寸图片
+    image_variants = models.JSONField(default=dict, blank=True, editable=False, verbose_name='图片尺寸版本')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
     
     class Meta:
@@ -128,6 +216,19 @@ class AcupointMassage(models.Model):
     def __str__(self):
         return f"{self.name} ({self.get_body_part_display()})"
 
+    @property
+    def image_webp_srcset(self):
+        return images.srcset(self.image_variants, 'webp')
+
+    @property
+    def image_jpeg_srcset(self):
+        return images.srcset(self.image_variants, 'jpeg')
+
+    @property
+    def image_thumbnail(self):
+        """最小一档 JPEG，作为 img 的 src 及宽高"""
+        return images.thumbnail(self.image_variants)
+
 
 class UserProfile(models.Model):
     """用户扩展信息模型"""
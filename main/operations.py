@@ -0,0 +1,26 @@
+"""迁移操作
+
+在 PostgreSQL 上以 CONCURRENTLY 方式增加索引，建索引期间不锁表，线上可直接执行；
+SQLite 等其他数据库按普通方式执行。使用这些操作的迁移须设置 atomic = False。
+"""
+from django.db import migrations
+
+
+class AddIndexConcurrently(migrations.AddIndex):
+    """增加索引，PostgreSQL 上使用 CREATE INDEX CONCURRENTLY"""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != 'postgresql':
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+        from django.contrib.postgres.operations import AddIndexConcurrently as PostgresAddIndex
+        PostgresAddIndex(self.model_name, self.index).database_forwards(
+            app_label, schema_editor, from_state, to_state
+        )
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != 'postgresql':
+            return super().database_backwards(app_label, schema_editor, from_state, to_state)
+        from django.contrib.postgres.operations import AddIndexConcurrently as PostgresAddIndex
+        PostgresAddIndex(self.model_name, self.index).database_backwards(
+            app_label, schema_editor, from_state, to_state
+        )
@@ -0,0 +1,146 @@
+"""游标（keyset）分页
+
+按若干字段倒序排列，用上一页最后一行的字段值作为游标定位下一页，
+查询代价只与每页条数有关，与历史记录总数无关。
+
+管理后台的大表另用 EstimatedCountPaginator，总数超过阈值后只显示估算值。
+"""
+import json
+
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Max, Q
+from django.utils.functional import cached_property
+
+CURSOR_SEPARATOR = ','
+
+
+class KeysetPage:
+    """一页数据及前后页游标"""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+    """按 keys 字段倒序的游标分页器，keys 的最后一个字段须唯一（通常为 id）"""
+
+    def __init__(self, queryset, keys, per_page=20):
+        self.queryset = queryset
+        self.keys = keys
+        self.per_page = per_page
+
+    def encode(self, obj):
+        return CURSOR_SEPARATOR.join(
+            getattr(obj, key).isoformat() if hasattr(getattr(obj, key), 'isoformat')
+            else str(getattr(obj, key))
+            for key in self.keys
+        )
+
+    def decode(self, cursor):
+        """解析游标，格式不正确时返回 None"""
+        if not cursor:
+            return None
+        values = cursor.split(CURSOR_SEPARATOR)
+        if len(values) != len(self.keys):
+            return None
+        opts = self.queryset.model._meta
+        try:
+            return [opts.get_field(key).to_python(value) for key, value in zip(self.keys, values)]
+        except Exception:
+            return None
+
+    def _seek(self, values, lookup):
+        # (k1 < v1) OR (k1 = v1 AND k2 < v2) OR ...
+        condition = Q()
+        for i, key in enumerate(self.keys):
+            clause = Q(**{f'{key}__{lookup}': values[i]})
+            for prev_key, prev_value in zip(self.keys[:i], values[:i]):
+                clause &= Q(**{prev_key: prev_value})
+            condition |= clause
+        return self.queryset.filter(condition)
+
+    def page(self, after=None, before=None):
+        """获取 after 游标之后（更早）或 before 游标之前（更新）的一页"""
+        descending = [f'-{key}' for key in self.keys]
+        ascending = list(self.keys)
+
+        before_values = self.decode(before)
+        if before_values is not None:
+            rows = list(self._seek(before_values, 'gt').order_by(*ascending)[:self.per_page + 1])
+            has_more = len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+            return KeysetPage(
+                rows,
+                next_cursor=self.encode(rows[-1]) if rows else None,
+                previous_cursor=self.encode(rows[0]) if rows and has_more else None,
+            )
+
+        after_values = self.decode(after)
+        queryset = self._seek(after_values, 'lt') if after_values is not None else self.queryset
+        rows = list(queryset.order_by(*descending)[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        return KeysetPage(
+            rows,
+            next_cursor=self.encode(rows[-1]) if rows and has_more else None,
+            previous_cursor=self.encode(rows[0]) if rows and after_values is not None else None,
+        )
+
+
+class EstimatedCountPaginator(Paginator):
+    """管理后台用的分页器：最多精确数到 exact_limit 条，超出后改用估算值，
+    避免大表每次打开列表页都执行一次全表 COUNT(*)"""
+
+    exact_limit = 1000
+    count_is_exact = True
+    count_is_estimate = False
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list.order_by()
+        exact = queryset[:self.exact_limit + 1].count()
+        if exact <= self.exact_limit:
+            return exact
+        self.count_is_exact = False
+        estimate = estimate_count(queryset)
+        if estimate is None:
+            return exact
+        self.count_is_estimate = True
+        return max(estimate, exact)
+
+    @property
+    def count_display(self):
+        count = self.count
+        if self.count_is_exact:
+            return str(count)
+        if self.count_is_estimate:
+            return f'约 {count}'
+        return f'{self.exact_limit} 以上'
+
+
+def estimate_count(queryset):
+    """估算行数：PostgreSQL 取查询计划的估计行数，SQLite 对未过滤的查询取最大主键，其他情况返回 None"""
+    vendor = connections[queryset.db].vendor
+    if vendor == 'postgresql':
+        plan = json.loads(queryset.explain(format='json'))
+        return int(plan[0]['Plan']['Plan Rows'])
+    if vendor == 'sqlite' and not queryset.query.where:
+        return queryset.aggregate(max_pk=Max('pk'))['max_pk']
+    return None
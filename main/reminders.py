@@ -0,0 +1,152 @@
+"""时辰提醒发送
+
+每个时辰开始时，按 (time_slot, is_active) 索引分批读取该时辰全部有效提醒，
+交给可替换的发送后端（站内信、邮件、Webhook）。
+ReminderDispatch 记录每个时辰的发送进度：每一轮批次发送完成后才推进断点，
+进程重启后从断点继续，已完成的时辰不会再次发送。
+站内信后端在同一事务中写消息和断点，恰好发送一次；
+邮件和 Webhook 后端在线程池中并发发送，重启时最多重发中断的那一轮。
+"""
+import json
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core import mail
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from .models import Reminder, ReminderDispatch, ReminderMessage
+
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_WORKERS = 8
+
+
+def reminder_content(reminder):
+    """提醒内容，未自定义时使用时辰养生要点"""
+    return reminder.custom_message or reminder.time_slot.health_tips
+
+
+def reminder_title(reminder):
+    return f'{reminder.time_slot.chinese_name}养生提醒'
+
+
+class BaseDeliveryBackend:
+    """发送后端基类"""
+
+    # 为 True 时在写入发送断点的同一事务中调用 send_batch
+    transactional = False
+
+    def send_batch(self, reminders):
+        raise NotImplementedError
+
+
+class InboxBackend(BaseDeliveryBackend):
+    """写入站内信箱"""
+
+    transactional = True
+
+    def send_batch(self, reminders):
+        ReminderMessage.objects.bulk_create([
+            ReminderMessage(user_id=r.user_id, time_slot_id=r.time_slot_id, content=reminder_content(r))
+            for r in reminders
+        ])
+
+
+class EmailBackend(BaseDeliveryBackend):
+    """通过 EMAIL_BACKEND 发送邮件，每批复用一个连接"""
+
+    def send_batch(self, reminders):
+        messages = [
+            mail.EmailMessage(reminder_title(r), reminder_content(r), to=[r.user.email])
+            for r in reminders if r.user.email
+        ]
+        if messages:
+            with mail.get_connection() as connection:
+                connection.send_messages(messages)
+
+
+class WebhookBackend(BaseDeliveryBackend):
+    """每批向 REMINDER_WEBHOOK_URL 发送一次 JSON 请求"""
+
+    timeout = 10
+
+    def send_batch(self, reminders):
+        payload = json.dumps({
+            'reminders': [
+                {
+                    'user_id': r.user_id,
+                    'username': r.user.username,
+                    'time_slot': r.time_slot.name,
+                    'title': reminder_title(r),
+                    'content': reminder_content(r),
+                }
+                for r in reminders
+            ],
+        }, ensure_ascii=False).encode('utf-8')
+        request = urllib.request.Request(
+            settings.REMINDER_WEBHOOK_URL, data=payload,
+            headers={'Content-Type': 'application/json; charset=utf-8'},
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+def get_backend(path=None):
+    return import_string(path or settings.REMINDER_DELIVERY_BACKEND)()
+
+
+def slot_boundary(slot, now=None):
+    """时辰本次开始的时间，跨日时辰（如凌晨的子时）取前一天的开始时间"""
+    now = now or datetime.now()
+    boundary = datetime.combine(now.date(), slot.start_time)
+    if boundary > now:
+        boundary -= timedelta(days=1)
+    return boundary
+
+
+def dispatch_slot(slot, boundary, backend, batch_size=DEFAULT_BATCH_SIZE, workers=DEFAULT_WORKERS):
+    """发送某个时辰的全部有效提醒，返回 ReminderDispatch"""
+    dispatch, _ = ReminderDispatch.objects.get_or_create(time_slot=slot, boundary=boundary)
+    if dispatch.completed_at:
+        return dispatch
+
+    reminders = (
+        Reminder.objects
+        .filter(time_slot=slot, is_active=True)
+        .select_related('user')
+        .only('id', 'user_id', 'time_slot_id', 'custom_message', 'user__username', 'user__email')
+        .order_by('id')
+    )
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while True:
+            # 一轮取 workers 个批次并发发送，全部完成后再推进断点
+            batches = []
+            last_id = dispatch.last_reminder_id
+            for _ in range(workers):
+                batch = list(reminders.filter(id__gt=last_id)[:batch_size])
+                if not batch:
+                    break
+                for reminder in batch:
+                    reminder.time_slot = slot
+                batches.append(batch)
+                last_id = batch[-1].id
+            if not batches:
+                break
+
+            dispatch.last_reminder_id = last_id
+            dispatch.sent_count += sum(len(batch) for batch in batches)
+            if backend.transactional:
+                with transaction.atomic():
+                    for batch in batches:
+                        backend.send_batch(batch)
+                    dispatch.save(update_fields=['last_reminder_id', 'sent_count'])
+            else:
+                list(pool.map(backend.send_batch, batches))
+                dispatch.save(update_fields=['last_reminder_id', 'sent_count'])
+
+    dispatch.completed_at = datetime.now()
+    dispatch.save(update_fields=['completed_at'])
+    return dispatch
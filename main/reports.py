@@ -0,0 +1,137 @@
+"""耳鸣日记关联分析报告
+
+把诱发因素、情绪、按摩穴位、按摩效果四个文本字段切分为词条，
+一次遍历建立 词条 → 日记 的倒排索引，再计算：
+
+* 每个词条出现时的平均严重程度相对整体均值的提升度（lift）；
+* 词条出现次日的平均严重程度；
+* 当天睡眠质量与次日严重程度的相关系数。
+
+报告按用户缓存，直到该用户下一次写日记（见 caching.bump_user_diary_version）。
+"""
+import re
+from collections import defaultdict
+from datetime import timedelta
+from math import sqrt
+
+from django.core.cache import cache
+
+from .caching import get_user_diary_version
+from .models import TinnitusLog
+
+REPORT_FIELDS = (
+    ('triggers', '诱发因素'),
+    ('mood', '情绪状态'),
+    ('massage_points', '按摩穴位'),
+    ('massage_effect', '按摩效果'),
+)
+
+# 词条至少出现的次数，次数过少的词条不参与排名
+MIN_TERM_SUPPORT = 3
+# 每个字段展示的词条数
+TERMS_PER_FIELD = 10
+# 严重程度不低于该值视为“高严重程度”
+HIGH_SEVERITY = 4
+
+REPORT_CACHE_TIMEOUT = 7 * 24 * 3600
+
+_SEPARATORS = re.compile(r'[\s,，、;；。.!！?？/|()（）]+')
+
+
+def tokenize(text):
+    """按标点和空白切分词条，去重并保持原顺序"""
+    terms = []
+    for term in _SEPARATORS.split(text.lower()):
+        if term and len(term) <= 20 and term not in terms:
+            terms.append(term)
+    return terms
+
+
+def _pearson(pairs):
+    n = len(pairs)
+    if n < 3:
+        return None
+    mean_x = sum(x for x, _ in pairs) / n
+    mean_y = sum(y for _, y in pairs) / n
+    cov = sum((x - mean_x) * (y - mean_y) for x, y in pairs)
+    var_x = sum((x - mean_x) ** 2 for x, _ in pairs)
+    var_y = sum((y - mean_y) ** 2 for _, y in pairs)
+    if not var_x or not var_y:
+        return None
+    return round(cov / sqrt(var_x * var_y), 3)
+
+
+def build_report(user_id):
+    """遍历用户全部日记生成报告"""
+    rows = (
+        TinnitusLog.objects
+        .filter(user_id=user_id)
+        .order_by()
+        .values_list('date', 'severity', 'sleep_quality', *(field for field, _ in REPORT_FIELDS))
+    )
+
+    severities = []
+    day_severity = defaultdict(list)
+    day_sleep = defaultdict(list)
+    index = {field: defaultdict(list) for field, _ in REPORT_FIELDS}
+
+    for position, (day, severity, sleep_quality, *texts) in enumerate(rows.iterator(chunk_size=2000)):
+        severities.append((day, severity))
+        day_severity[day].append(severity)
+        if sleep_quality:
+            day_sleep[day].append(sleep_quality)
+        for (field, _), text in zip(REPORT_FIELDS, texts):
+            for term in tokenize(text):
+                index[field][term].append(position)
+
+    total = len(severities)
+    if not total:
+        return {'log_count': 0, 'fields': [], 'sleep_correlation': None, 'sleep_pairs': 0}
+
+    overall = sum(severity for _, severity in severities) / total
+    day_mean = {day: sum(values) / len(values) for day, values in day_severity.items()}
+
+    fields = []
+    for field, label in REPORT_FIELDS:
+        terms = []
+        for term, positions in index[field].items():
+            if len(positions) < MIN_TERM_SUPPORT:
+                continue
+            values = [severities[p][1] for p in positions]
+            mean = sum(values) / len(values)
+            next_days = [day_mean[d] for d in {severities[p][0] + timedelta(days=1) for p in positions} if d in day_mean]
+            terms.append({
+                'term': term,
+                'count': len(positions),
+                'severity_avg': round(mean, 2),
+                'lift': round(mean / overall, 2),
+                'high_severity_rate': round(sum(v >= HIGH_SEVERITY for v in values) / len(values), 2),
+                'next_day_severity_avg': round(sum(next_days) / len(next_days), 2) if next_days else None,
+            })
+        terms.sort(key=lambda item: (-item['lift'], -item['count']))
+        fields.append({'field': field, 'label': label, 'terms': terms[:TERMS_PER_FIELD]})
+
+    # 当天平均睡眠质量与次日平均严重程度
+    pairs = [
+        (sum(values) / len(values), day_mean[day + timedelta(days=1)])
+        for day, values in day_sleep.items()
+        if day + timedelta(days=1) in day_mean
+    ]
+
+    return {
+        'log_count': total,
+        'severity_avg': round(overall, 2),
+        'fields': fields,
+        'sleep_correlation': _pearson(pairs),
+        'sleep_pairs': len(pairs),
+    }
+
+
+def user_report(user_id):
+    """获取用户报告，日记未变化时直接读取缓存"""
+    key = f'diary_report:{user_id}:{get_user_diary_version(user_id)}'
+    report = cache.get(key)
+    if report is None:
+        report = build_report(user_id)
+        cache.set(key, report, REPORT_CACHE_TIMEOUT)
+    return report
@@ -0,0 +1,252 @@
+"""全文检索
+
+穴位（名称、位置、功效）和日记（症状、诱因、按摩穴位、按摩效果、情绪、备注）各有一张索引表，
+以模型主键为键，由信号在保存和删除时增量维护，批量写入后调用 index_logs。
+中文没有空格分词，文本先切成相邻两字的词（“耳鸣严重”→ 耳鸣 鸣严 严重 重），
+每段末字单独成词，因此单字查询也能用前缀匹配；英文和数字按单词切分并转小写。
+查询词同样切分，多字词要求各两字词位置相邻（短语查询），多个查询词之间为“且”。
+
+SQLite 使用 FTS5 虚拟表，PostgreSQL 使用 tsvector 列加 GIN 索引，
+日记索引带用户标记，检索个人日记时直接在索引中与用户求交，不扫描其他用户的匹配行。
+其他数据库退回到 icontains 查询。
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+ACUPOINT_FIELDS = ['name', 'location_description', 'benefits']
+LOG_FIELDS = ['symptoms', 'triggers', 'massage_points', 'massage_effect', 'mood', 'notes']
+
+ACUPOINT_TABLE = {'sqlite': 'main_acupoint_fts', 'postgresql': 'main_acupoint_search'}
+LOG_TABLE = {'sqlite': 'main_tinnitus_log_fts', 'postgresql': 'main_tinnitus_log_search'}
+# 穴位名称、位置、功效的权重
+ACUPOINT_WEIGHTS = (10.0, 2.0, 1.0)
+REBUILD_BATCH_SIZE = 2000
+
+# 连续的汉字（含扩展 A 区和兼容汉字）或连续的字母数字
+_RUN_RE = re.compile('[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+|[0-9a-z]+')
+
+
+def _is_cjk(run):
+    return run[0] >= '\u3400'
+
+
+def tokenize(text):
+    """切分为索引用的词，以空格连接"""
+    tokens = []
+    for run in _RUN_RE.findall((text or '').lower()):
+        if _is_cjk(run):
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+            tokens.append(run[-1])
+        else:
+            tokens.append(run)
+    return ' '.join(tokens)
+
+
+def _query_terms(query):
+    """查询词列表：(原词, 两字词列表, 是否前缀匹配)"""
+    terms = []
+    for run in _RUN_RE.findall((query or '').lower()):
+        if _is_cjk(run) and len(run) > 1:
+            terms.append((run, [run[i:i + 2] for i in range(len(run) - 1)], False))
+        else:
+            terms.append((run, [run], True))
+    return terms
+
+
+def _fts5_query(terms, column=None):
+    prefix_column = f'{column} : ' if column else ''
+    return ' AND '.join(
+        f'{prefix_column}"{" ".join(tokens)}"' + ('*' if prefix else '') for _, tokens, prefix in terms
+    )
+
+
+def _tsquery(terms):
+    return ' & '.join(
+        '(' + ' <-> '.join(f"'{token}'" for token in tokens) + (':*' if prefix else '') + ')'
+        for _, tokens, prefix in terms
+    )
+
+
+def _vendor():
+    return connection.vendor if connection.vendor in ACUPOINT_TABLE else None
+
+
+# 索引维护
+
+def index_acupoint(acupoint):
+    vendor = _vendor()
+    if vendor is None:
+        return
+    values = [tokenize(getattr(acupoint, field)) for field in ACUPOINT_FIELDS]
+    with connection.cursor() as cursor:
+        if vendor == 'sqlite':
+            cursor.execute(
+                'INSERT OR REPLACE INTO main_acupoint_fts (rowid, name, location, benefits) VALUES (%s, %s, %s, %s)',
+                [acupoint.pk, *values],
+            )
+        else:
+            cursor.execute(
+                'INSERT INTO main_acupoint_search (acupoint_id, document) VALUES (%s, '
+                "setweight(to_tsvector('simple', %s), 'A') || setweight(to_tsvector('simple', %s), 'B') "
+                "|| setweight(to_tsvector('simple', %s), 'C')) "
+                'ON CONFLICT (acupoint_id) DO UPDATE SET document = EXCLUDED.document',
+                [acupoint.pk, *values],
+            )
+
+
+def index_logs(logs):
+    """写入或更新一批日记的索引（批量写入日记后调用）"""
+    vendor = _vendor()
+    if vendor is None:
+        return
+    rows = [
+        (log.pk, log.user_id, ' '.join(tokenize(getattr(log, field)) for field in LOG_FIELDS))
+        for log in logs
+    ]
+    if not rows:
+        return
+    with connection.cursor() as cursor:
+        if vendor == 'sqlite':
+            cursor.executemany(
+                'INSERT OR REPLACE INTO main_tinnitus_log_fts (rowid, owner, body) VALUES (%s, %s, %s)',
+                [(pk, f'u{user_id}', body) for pk, user_id, body in rows],
+            )
+        else:
+            cursor.executemany(
+                "INSERT INTO main_tinnitus_log_search (log_id, user_id, document) VALUES (%s, %s, to_tsvector('simple', %s)) "
+                'ON CONFLICT (log_id) DO UPDATE SET user_id = EXCLUDED.user_id, document = EXCLUDED.document',
+                rows,
+            )
+
+
+def _delete(tables, key, pk):
+    vendor = _vendor()
+    if vendor is None:
+        return
+    with connection.cursor() as cursor:
+        column = 'rowid' if vendor == 'sqlite' else key
+        cursor.execute(f'DELETE FROM {tables[vendor]} WHERE {column} = %s', [pk])
+
+
+def unindex_acupoint(pk):
+    _delete(ACUPOINT_TABLE, 'acupoint_id', pk)
+
+
+def unindex_log(pk):
+    _delete(LOG_TABLE, 'log_id', pk)
+
+
+def rebuild(acupoints, logs):
+    """清空并重建全部索引，logs 按主键分批读取"""
+    vendor = _vendor()
+    if vendor is None:
+        return
+    with connection.cursor() as cursor:
+        for tables in (ACUPOINT_TABLE, LOG_TABLE):
+            cursor.execute(f'DELETE FROM {tables[vendor]}')
+    for acupoint in acupoints.only('pk', *ACUPOINT_FIELDS):
+        index_acupoint(acupoint)
+    last_pk = 0
+    logs = logs.only('pk', 'user_id', *LOG_FIELDS).order_by('pk')
+    while True:
+        batch = list(logs.filter(pk__gt=last_pk)[:REBUILD_BATCH_SIZE])
+        if not batch:
+            break
+        index_logs(batch)
+        last_pk = batch[-1].pk
+
+
+# 检索
+
+def _fallback_q(fields, terms):
+    condition = Q()
+    for word, _, _ in terms:
+        term = Q()
+        for field in fields:
+            term |= Q(**{f'{field}__icontains': word})
+        condition &= term
+    return condition
+
+
+def _acupoints_sql(vendor, terms, ranked):
+    if vendor == 'sqlite':
+        sql = 'SELECT rowid FROM main_acupoint_fts WHERE main_acupoint_fts MATCH %s'
+        weights = ', '.join(str(weight) for weight in ACUPOINT_WEIGHTS)
+        return sql + (f' ORDER BY bm25(main_acupoint_fts, {weights})' if ranked else ''), [_fts5_query(terms)]
+    tsquery = _tsquery(terms)
+    sql = "SELECT acupoint_id FROM main_acupoint_search WHERE document @@ to_tsquery('simple', %s)"
+    if not ranked:
+        return sql, [tsquery]
+    return sql + " ORDER BY ts_rank(document, to_tsquery('simple', %s)) DESC", [tsquery, tsquery]
+
+
+def _logs_sql(vendor, terms, ranked, user_id=None):
+    if vendor == 'sqlite':
+        match = _fts5_query(terms, 'body')
+        if user_id is not None:
+            # 用户标记与查询词在索引中求交
+            match = f'owner : u{int(user_id)} AND {match}'
+        sql = 'SELECT rowid FROM main_tinnitus_log_fts WHERE main_tinnitus_log_fts MATCH %s'
+        return sql + (' ORDER BY rank' if ranked else ''), [match]
+    tsquery = _tsquery(terms)
+    sql, params = "SELECT log_id FROM main_tinnitus_log_search WHERE document @@ to_tsquery('simple', %s)", [tsquery]
+    if user_id is not None:
+        sql += ' AND user_id = %s'
+        params.append(user_id)
+    if not ranked:
+        return sql, params
+    return sql + " ORDER BY ts_rank(document, to_tsquery('simple', %s)) DESC", params + [tsquery]
+
+
+def _ranked(queryset, sql, params, limit):
+    with connection.cursor() as cursor:
+        cursor.execute(f'{sql} LIMIT %s', [*params, limit])
+        ids = [row[0] for row in cursor.fetchall()]
+    objects = queryset.in_bulk(ids)
+    return [objects[pk] for pk in ids if pk in objects]
+
+
+def search_acupoints(query, limit=20):
+    """按相关度排序的匹配穴位"""
+    from .models import AcupointMassage
+
+    terms = _query_terms(query)
+    if not terms:
+        return []
+    queryset = AcupointMassage.objects.all()
+    vendor = _vendor()
+    if vendor is None:
+        return list(queryset.filter(_fallback_q(ACUPOINT_FIELDS, terms))[:limit])
+    return _ranked(queryset, *_acupoints_sql(vendor, terms, ranked=True), limit)
+
+
+def search_logs(user, query, limit=50):
+    """按相关度排序的该用户的匹配日记"""
+    from .models import TinnitusLog
+
+    terms = _query_terms(query)
+    if not terms:
+        return []
+    queryset = TinnitusLog.objects.filter(user=user).select_related('time_slot')
+    vendor = _vendor()
+    if vendor is None:
+        return list(queryset.filter(_fallback_q(LOG_FIELDS, terms)).order_by('-date')[:limit])
+    return _ranked(queryset, *_logs_sql(vendor, terms, ranked=True, user_id=user.pk), limit)
+
+
+def matching_q(model, query):
+    """管理后台用：匹配 query 的记录条件，以子查询过滤，不在 Python 中物化 ID 列表"""
+    from .models import AcupointMassage
+
+    terms = _query_terms(query)
+    if not terms:
+        return Q(pk__in=[])
+    is_acupoint = model is AcupointMassage
+    vendor = _vendor()
+    if vendor is None:
+        return _fallback_q(ACUPOINT_FIELDS if is_acupoint else LOG_FIELDS, terms)
+    sql, params = (_acupoints_sql if is_acupoint else _logs_sql)(vendor, terms, ranked=False)
+    return Q(pk__in=RawSQL(sql, params))
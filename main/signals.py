@@ -0,0 +1,110 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import pre_save, post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from . import dashboard, images, metrics, search, stats, time_slots
+from .caching import bump_content_version, bump_user_diary_version
+from .models import TimeSlot, TinnitusLog, Reminder, AcupointMassage
+
+
+@receiver([post_save, post_delete], sender=TimeSlot)
+def invalidate_time_slot_index(sender, **kwargs):
+    """时辰变更后使进程内查找表失效"""
+    time_slots.invalidate()
+
+
+@receiver([post_save, post_delete], sender=TimeSlot)
+@receiver([post_save, post_delete], sender=AcupointMassage)
+@receiver(m2m_changed, sender=AcupointMassage.related_time_slots.through)
+def invalidate_content_cache(sender, **kwargs):
+    """时辰或穴位变更后使页面缓存失效"""
+    bump_content_version()
+
+
+@receiver(post_save, sender=AcupointMassage)
+def generate_acupoint_image_variants(sender, instance, raw=False, **kwargs):
+    """保存穴位后为新图片生成各档尺寸"""
+    if not raw and images.refresh_variants(instance):
+        bump_content_version()
+
+
+@receiver(pre_save, sender=TinnitusLog)
+def remember_tinnitus_log_bucket(sender, instance, **kwargs):
+    """记录修改前日记所在的汇总格"""
+    instance._previous_stats_bucket = None
+    if instance.pk:
+        previous = sender.objects.filter(pk=instance.pk).values('user_id', 'date', 'time_slot_id').first()
+        if previous:
+            instance._previous_stats_bucket = (
+                previous['user_id'], previous['date'], stats.slot_name_for(previous['time_slot_id'])
+            )
+
+
+@receiver(post_save, sender=TinnitusLog)
+def update_tinnitus_stats_on_save(sender, instance, created, **kwargs):
+    """日记新增时累加汇总，修改时重算前后所在的汇总格"""
+    if created:
+        stats.record_log_created(instance)
+        return
+    buckets = {stats.bucket_for(instance), getattr(instance, '_previous_stats_bucket', None)}
+    for bucket in buckets - {None}:
+        stats.refresh_bucket(*bucket)
+
+
+@receiver(post_delete, sender=TinnitusLog)
+def update_tinnitus_stats_on_delete(sender, instance, **kwargs):
+    """日记删除后重算所在的汇总格"""
+    stats.refresh_bucket(*stats.bucket_for(instance))
+
+
+@receiver([post_save, post_delete], sender=TinnitusLog)
+def invalidate_diary_cache(sender, instance, **kwargs):
+    """日记变更后使该用户的分析报告缓存失效"""
+    bump_user_diary_version(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=TinnitusLog)
+@receiver([post_save, post_delete], sender=Reminder)
+def refresh_dashboard(sender, instance, raw=False, **kwargs):
+    """日记或提醒变更后重建该用户的助手页快照"""
+    if not raw:
+        dashboard.refresh_on_commit(instance.user_id)
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    """新建连接时挂上 SQL 统计"""
+    metrics.instrument_connection(connection)
+
+
+@receiver(connection_created)
+def configure_sqlite_connection(sender, connection, **kwargs):
+    """新建 SQLite 连接时执行数据库配置中的 PRAGMAS"""
+    pragmas = connection.settings_dict.get('PRAGMAS')
+    if connection.vendor != 'sqlite' or not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+@receiver(post_save, sender=AcupointMassage)
+def index_acupoint(sender, instance, **kwargs):
+    """保存穴位后更新全文索引"""
+    search.index_acupoint(instance)
+
+
+@receiver(post_save, sender=TinnitusLog)
+def index_tinnitus_log(sender, instance, **kwargs):
+    """保存日记后更新全文索引"""
+    search.index_logs([instance])
+
+
+@receiver(post_delete, sender=AcupointMassage)
+def unindex_acupoint(sender, instance, **kwargs):
+    search.unindex_acupoint(instance.pk)
+
+
+@receiver(post_delete, sender=TinnitusLog)
+def unindex_tinnitus_log(sender, instance, **kwargs):
+    search.unindex_log(instance.pk)
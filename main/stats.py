@@ -0,0 +1,189 @@
+"""耳鸣日记统计
+
+每位用户按 日期 × 时辰 维护一行 TinnitusDailyAggregate：
+新增日记时用一条 UPDATE 原地累加；修改或删除日记时只重算受影响的那一格。
+统计页面只读取时间窗口内的汇总行，代价与天数成正比，与日记条数无关。
+"""
+from datetime import date, timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Q, Sum, Value
+from django.db.models.functions import Greatest
+
+from .models import TinnitusDailyAggregate, TinnitusLog
+from .time_slots import get_index
+
+# 统计页面支持的时间窗口（天）
+STATS_WINDOWS = (7, 30, 365)
+DEFAULT_STATS_WINDOW = 30
+
+
+def slot_name_for(time_slot_id):
+    """日记所属时辰的名称，未记录时辰或时辰不在查找表中时为空字符串"""
+    if time_slot_id is None:
+        return ''
+    slot = get_index().by_id.get(time_slot_id)
+    return slot.name if slot else ''
+
+
+def bucket_for(log):
+    return (log.user_id, log.date, slot_name_for(log.time_slot_id))
+
+
+def _bucket_logs(user_id, day, slot_name):
+    logs = TinnitusLog.objects.filter(user_id=user_id, date=day)
+    index = get_index()
+    if not slot_name:
+        # 与 slot_name_for 一致：时辰不在查找表中的日记同样归入“未记录时辰”
+        return logs.filter(Q(time_slot__isnull=True) | ~Q(time_slot_id__in=list(index.by_id)))
+    slot = index.by_name.get(slot_name)
+    return logs.filter(time_slot_id=slot.id) if slot else logs.none()
+
+
+def record_log_created(log):
+    """新增日记时累加所在格的汇总"""
+    user_id, day, slot_name = bucket_for(log)
+    sleep_quality = log.sleep_quality or 0
+    sleep_count = 1 if log.sleep_quality else 0
+    aggregates = TinnitusDailyAggregate.objects.filter(user_id=user_id, date=day, slot_name=slot_name)
+
+    for _ in range(2):
+        updated = aggregates.update(
+            log_count=F('log_count') + 1,
+            severity_sum=F('severity_sum') + log.severity,
+            severity_max=Greatest('severity_max', Value(log.severity)),
+            duration_sum=F('duration_sum') + log.duration_minutes,
+            sleep_quality_sum=F('sleep_quality_sum') + sleep_quality,
+            sleep_quality_count=F('sleep_quality_count') + sleep_count,
+        )
+        if updated:
+            return
+        try:
+            with transaction.atomic():
+                TinnitusDailyAggregate.objects.create(
+                    user_id=user_id, date=day, slot_name=slot_name,
+                    log_count=1, severity_sum=log.severity, severity_max=log.severity,
+                    duration_sum=log.duration_minutes,
+                    sleep_quality_sum=sleep_quality, sleep_quality_count=sleep_count,
+                )
+            return
+        except IntegrityError:
+            # 并发写入时另一请求已创建该行，改为累加
+            continue
+
+
+def refresh_bucket(user_id, day, slot_name):
+    """根据原始日记重算一格汇总（修改、删除或批量导入后调用）"""
+    totals = _bucket_logs(user_id, day, slot_name).aggregate(
+        log_count=Count('id'),
+        severity_sum=Sum('severity'),
+        severity_max=Max('severity'),
+        duration_sum=Sum('duration_minutes'),
+        sleep_quality_sum=Sum('sleep_quality'),
+        sleep_quality_count=Count('sleep_quality'),
+    )
+    aggregates = TinnitusDailyAggregate.objects.filter(user_id=user_id, date=day, slot_name=slot_name)
+    if not totals['log_count']:
+        aggregates.delete()
+        return
+    TinnitusDailyAggregate.objects.update_or_create(
+        user_id=user_id, date=day, slot_name=slot_name,
+        defaults={key: value or 0 for key, value in totals.items()},
+    )
+
+
+def rebuild_range(user_id, start, end):
+    """重建用户在 [start, end] 日期范围内的全部汇总（批量写入日记后调用）"""
+    slot_names = {slot.id: slot.name for slot in get_index().slots}
+    rows = (
+        TinnitusLog.objects
+        .filter(user_id=user_id, date__gte=start, date__lte=end)
+        .values('date', 'time_slot_id')
+        .annotate(
+            log_count=Count('id'),
+            severity_sum=Sum('severity'),
+            severity_max=Max('severity'),
+            duration_sum=Sum('duration_minutes'),
+            sleep_quality_sum=Sum('sleep_quality'),
+            sleep_quality_count=Count('sleep_quality'),
+        )
+        .order_by()
+    )
+    aggregates = {}
+    for row in rows:
+        slot_name = slot_names.get(row.pop('time_slot_id'), '')
+        key = (row.pop('date'), slot_name)
+        if key in aggregates:
+            # 时辰已被删除的日记归入“未记录时辰”
+            existing = aggregates[key]
+            existing.log_count += row['log_count']
+            existing.severity_sum += row['severity_sum']
+            existing.severity_max = max(existing.severity_max, row['severity_max'])
+            existing.duration_sum += row['duration_sum']
+            existing.sleep_quality_sum += row['sleep_quality_sum'] or 0
+            existing.sleep_quality_count += row['sleep_quality_count']
+            continue
+        aggregates[key] = TinnitusDailyAggregate(
+            user_id=user_id, date=key[0], slot_name=slot_name,
+            **{field: value or 0 for field, value in row.items()},
+        )
+    with transaction.atomic():
+        TinnitusDailyAggregate.objects.filter(user_id=user_id, date__gte=start, date__lte=end).delete()
+        TinnitusDailyAggregate.objects.bulk_create(aggregates.values(), batch_size=500)
+
+
+def user_stats(user, days=DEFAULT_STATS_WINDOW, today=None):
+    """最近 days 天的统计，结果可直接序列化为 JSON"""
+    today = today or date.today()
+    start = today - timedelta(days=days - 1)
+    rows = TinnitusDailyAggregate.objects.filter(user=user, date__gte=start, date__lte=today)
+
+    index = get_index()
+    totals = {'log_count': 0, 'severity_sum': 0, 'severity_max': 0, 'duration_sum': 0,
+              'sleep_quality_sum': 0, 'sleep_quality_count': 0}
+    daily = {}
+    by_slot = {}
+    for row in rows:
+        for bucket in (totals,
+                       daily.setdefault(row.date, dict.fromkeys(totals, 0)),
+                       by_slot.setdefault(row.slot_name, dict.fromkeys(totals, 0))):
+            bucket['log_count'] += row.log_count
+            bucket['severity_sum'] += row.severity_sum
+            bucket['severity_max'] = max(bucket['severity_max'], row.severity_max)
+            bucket['duration_sum'] += row.duration_sum
+            bucket['sleep_quality_sum'] += row.sleep_quality_sum
+            bucket['sleep_quality_count'] += row.sleep_quality_count
+
+    def summary(bucket):
+        return {
+            'log_count': bucket['log_count'],
+            'severity_avg': _ratio(bucket['severity_sum'], bucket['log_count']),
+            'severity_max': bucket['severity_max'] or None,
+            'duration_total': bucket['duration_sum'],
+            'sleep_quality_avg': _ratio(bucket['sleep_quality_sum'], bucket['sleep_quality_count']),
+        }
+
+    slots = []
+    for slot_name, bucket in by_slot.items():
+        slot = index.by_name.get(slot_name)
+        order = index.slots.index(slot) if slot else len(index.slots)
+        slots.append((order, {
+            'slot': slot_name,
+            'chinese_name': slot.chinese_name if slot else '未记录',
+            **summary(bucket),
+        }))
+    slots.sort(key=lambda item: item[0])
+
+    return {
+        'days': days,
+        'start': start.isoformat(),
+        'end': today.isoformat(),
+        'active_days': len(daily),
+        'summary': summary(totals),
+        'daily': [{'date': day.isoformat(), **summary(bucket)} for day, bucket in sorted(daily.items())],
+        'time_slots': [item for _, item in slots],
+    }
+
+
+def _ratio(total, count):
+    return round(total / count, 2) if count else None
@@ -1,3 +1,1181 @@
-from django.test import TestCase
+import csv
+import importlib
+import json
+import os
+import shutil
+import tempfile
+from datetime import date, datetime, time, timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.utils import ConnectionHandler
+from django.conf import settings
+from django.http import HttpResponse
+from django.templatetags.static import static
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.template.loaders.cached import Loader as CachedLoader
+from django.shortcuts import render
+from django.urls import reverse
+from django.utils.cache import get_max_age
+from django.utils import timezone
+from django.utils.http import http_date, parse_http_date
+from django.utils.module_loading import import_string
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from . import dashboard, events, metrics, reminders, search, stats, time_slots
+from .management.commands.serve import gunicorn_command
+from .pagination import EstimatedCountPaginator
+from .reports import build_report, tokenize
+from .models import (
+    TimeSlot, TinnitusLog, TinnitusDailyAggregate, Reminder, ReminderMessage, ReminderDispatch, AcupointMassage,
+)
+
+# 批量导入、导出和压测的请求耗时较长，测试中提高慢请求阈值，避免整段 SQL 日志混入测试输出
+# （慢请求日志本身由 MetricsTests.test_slow_request_logged_with_queries 覆盖）
+quiet_slow_requests = override_settings(METRICS_SLOW_REQUEST_SECONDS=60)
+
+
+class TempMediaRootMixin:
+    """测试期间把 MEDIA_ROOT 指向临时目录，避免生成的图片写入项目目录"""
+
+    @classmethod
+    def setUpClass(cls):
+        media_root = tempfile.mkdtemp(prefix='test_media_')
+        cls.addClassCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=media_root)
+        override.enable()
+        cls.addClassCleanup(override.disable)
+        super().setUpClass()
+
+
+class SeededTestCase(TempMediaRootMixin, TestCase):
+    """使用 init_data 初始化十二时辰与穴位数据的测试基类"""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('init_data', stdout=StringIO())
+
+    def setUp(self):
+        time_slots.invalidate()
+        cache.clear()
+
+
+class TimeSlotIndexTests(SeededTestCase):
+
+    def test_current_slot_lookup(self):
+        index = time_slots.get_index()
+        self.assertEqual(index.current(datetime(2025, 1, 1, 12, 0)).name, 'wu')
+        self.assertEqual(index.current(datetime(2025, 1, 1, 23, 30)).name, 'zi')
+        self.assertEqual(index.current(datetime(2025, 1, 1, 0, 59)).name, 'zi')
+        self.assertEqual(index.current(datetime(2025, 1, 1, 1, 0)).name, 'chou')
+
+    def test_seconds_until_change(self):
+        index = time_slots.get_index()
+        self.assertEqual(index.seconds_until_change(datetime(2025, 1, 1, 12, 30, 0)), 1800)
+        self.assertEqual(index.seconds_until_change(datetime(2025, 1, 1, 22, 59, 59)), 1)
+        self.assertEqual(index.seconds_until_change(datetime(2025, 1, 1, 23, 0, 0)), 7200)
+
+    def test_home_and_api_do_not_query_time_slots(self):
+        time_slots.get_index()
+        with self.assertNumQueries(0):
+            self.client.get(reverse('home'))
+            self.client.get(reverse('current_time_slot_api'))
+
+    def test_index_invalidated_on_save(self):
+        index = time_slots.get_index()
+        slot = TimeSlot.objects.get(name='wu')
+        slot.chinese_name = '正午'
+        slot.save()
+        self.assertIsNot(time_slots.get_index(), index)
+        self.assertEqual(time_slots.get_index().by_name['wu'].chinese_name, '正午')
+
+
+class CurrentTimeSlotApiTests(SeededTestCase):
+
+    def test_cache_headers_and_conditional_get(self):
+        url = reverse('current_time_slot_api')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('max-age=', response['Cache-Control'])
+        self.assertFalse(response.has_header('Last-Modified'))
+        # Expires 为绝对的时辰切换时刻，与 max-age 一致
+        expires = parse_http_date(response['Expires'])
+        self.assertAlmostEqual(expires, datetime.now().timestamp() + get_max_age(response), delta=2)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_without_slot_boundaries(self):
+        url = reverse('current_time_slot_api')
+        # 只有一个全天时辰时没有切换点，使用固定的短缓存时间
+        TimeSlot.objects.exclude(name='wu').delete()
+        TimeSlot.objects.filter(name='wu').update(start_time=time(0, 0), end_time=time(0, 0))
+        time_slots.invalidate()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['name'], 'wu')
+        self.assertEqual(get_max_age(response), 60)
+        self.assertIn('Expires', response)
+
+        # 没有时辰数据时返回错误信息，不缓存
+        TimeSlot.objects.all().delete()
+        time_slots.invalidate()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('error', response.json())
+        self.assertIn('no-cache', response['Cache-Control'])
+
+    def test_if_modified_since_alone_not_revalidated(self):
+        # 上一个时辰的缓存只携带 If-Modified-Since 时必须返回新的时辰
+        url = reverse('current_time_slot_api')
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=http_date())
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_changes_when_slot_updated(self):
+        url = reverse('current_time_slot_api')
+        etag = self.client.get(url)['ETag']
+        slot = time_slots.current_time_slot()
+        slot.health_tips = '新的养生要点'
+        slot.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class AnonymousPageCacheTests(SeededTestCase):
+
+    def test_anonymous_pages_served_from_cache(self):
+        url = reverse('acupoint_list')
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertContains(response, '穴位按摩指导')
+
+    def test_only_known_query_params_cached(self):
+        url = reverse('acupoint_list')
+        self.client.get(url, {'body_part': 'ear'})
+        with self.assertNumQueries(0):
+            self.client.get(url, {'body_part': 'ear'})
+        # 其他参数或未知的部位不进入缓存
+        for params in [{'body_part': 'ear', 'utm': 'x'}, {'body_part': 'nowhere'}, {'page': '2'}]:
+            self.client.get(url, params)
+            with mock.patch('main.views.render', wraps=render) as view_render:
+                self.client.get(url, params)
+            view_render.assert_called_once()
+        self.assertIsNone(self.client.get(url, {'body_part': 'nowhere'}).context['selected_body_part'])
+
+    def test_cache_invalidated_on_acupoint_save(self):
+        url = reverse('acupoint_list')
+        self.client.get(url)
+        acupoint = AcupointMassage.objects.first()
+        acupoint.name = '新穴位名称'
+        acupoint.save()
+        self.assertContains(self.client.get(url), '新穴位名称')
+
+    def test_logged_in_users_bypass_cache(self):
+        url = reverse('about')
+        self.client.get(url)
+        user = User.objects.create_user('cached', password='pass12345')
+        self.client.force_login(user)
+        self.assertContains(self.client.get(url), 'cached')
+
+
+class FragmentCacheTests(SeededTestCase):
+    """登录用户不走整页缓存，时辰圆盘和穴位卡片使用片段缓存"""
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(User.objects.create_user('fragments', password='pass12345'))
+
+    def test_acupoint_cards_cached_until_content_changes(self):
+        url = reverse('acupoint_list')
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        self.assertFalse([q['sql'] for q in queries if 'main_acupointmassage' in q['sql']])
+
+        acupoint = AcupointMassage.objects.first()
+        acupoint.benefits = '片段缓存已失效'
+        acupoint.save()
+        self.assertContains(self.client.get(url), '片段缓存已失效')
+        self.assertContains(self.client.get(url, {'body_part': acupoint.body_part}), '片段缓存已失效')
+
+    def test_time_wheel_varies_on_current_slot(self):
+        for now, name in ((datetime(2025, 3, 1, 12, 0), 'wu'), (datetime(2025, 3, 1, 0, 30), 'zi')):
+            with mock.patch('main.time_slots.datetime') as mocked:
+                mocked.now.return_value = now
+                response = self.client.get(reverse('home'))
+            self.assertRegex(response.content.decode(), r'current"\s+data-slot="%s"' % name)
+
+    def test_production_uses_cached_template_loader(self):
+        with mock.patch.dict(os.environ, {'DJANGO_SECRET_KEY': 'test'}):
+            prod = importlib.import_module('tinnitus_health.settings_prod')
+        params = {**prod.TEMPLATES[0], 'NAME': 'prod'}
+        params['OPTIONS'] = {**params['OPTIONS'], 'debug': True}
+        backend = import_string(params.pop('BACKEND'))(params)
+        loader = backend.engine.template_loaders[0]
+        self.assertIsInstance(loader, CachedLoader)
+        backend.get_template('main/home.html')
+        self.assertEqual(len(loader.get_template_cache), 1)
+
+
+class TinnitusLogListTests(SeededTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user = User.objects.create_user('logger', password='pass12345')
+        slot = TimeSlot.objects.get(name='wu')
+        TinnitusLog.objects.bulk_create([
+            TinnitusLog(
+                user=cls.user, date=date(2025, 1, 1) + timedelta(days=i // 3),
+                time_slot=slot, severity=i % 5 + 1, frequency='intermittent',
+                duration_minutes=10,
+            )
+            for i in range(45)
+        ])
+        stats.rebuild_range(cls.user.id, date(2025, 1, 1), date(2025, 1, 15))
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+
+    def test_counts_read_from_daily_aggregate(self):
+        TinnitusLog.objects.create(
+            user=self.user, date=date.today(), time_slot=TimeSlot.objects.get(name='wu'),
+            severity=3, frequency='intermittent', duration_minutes=10,
+        )
+        response = self.client.get(reverse('tinnitus_log_list'))
+        self.assertEqual(response.context['total_count'], 46)
+        self.assertEqual(response.context['month_count'], 1)
+
+    def test_keyset_pages_cover_every_log_once(self):
+        url = reverse('tinnitus_log_list')
+        seen = []
+        response = self.client.get(url)
+        while True:
+            page = response.context['logs']
+            self.assertLessEqual(len(page), 20)
+            seen.extend(log.id for log in page)
+            if not page.has_next:
+                break
+            response = self.client.get(url, {'after': page.next_cursor})
+        self.assertEqual(len(seen), 45)
+        self.assertEqual(len(set(seen)), 45)
+
+        previous = self.client.get(url, {'before': page.previous_cursor}).context['logs']
+        self.assertEqual([log.id for log in previous], seen[20:40])
+
+    def test_detail_fragment_is_owner_only(self):
+        log = TinnitusLog.objects.filter(user=self.user).first()
+        url = reverse('tinnitus_log_detail', args=[log.id])
+        self.assertContains(self.client.get(url), '日记详情')
+        self.client.force_login(User.objects.create_user('other', password='pass12345'))
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class QueryCountTests(SeededTestCase):
+    """查询次数不应随数据量增长"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user = User.objects.create_user('heavy', password='pass12345')
+        cls.admin = User.objects.get(username='admin')
+        slots = list(TimeSlot.objects.all())
+        TinnitusLog.objects.bulk_create([
+            TinnitusLog(
+                user=cls.user, date=date(2024, 1, 1) + timedelta(days=i // 4),
+                time_slot=slots[i % len(slots)], severity=i % 5 + 1,
+                frequency='continuous', duration_minutes=15,
+                symptoms='嗡嗡声', triggers='熬夜',
+            )
+            for i in range(1200)
+        ])
+        Reminder.objects.bulk_create([
+            Reminder(user=cls.user, time_slot=slot, is_active=True) for slot in slots
+        ])
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+
+    def test_tinnitus_log_list(self):
+        # 用户、汇总计数、本页数据（会话读自缓存）
+        with self.assertNumQueries(3):
+            self.client.get(reverse('tinnitus_log_list'))
+
+    def test_tinnitus_log_detail(self):
+        log = TinnitusLog.objects.filter(user=self.user).first()
+        with self.assertNumQueries(2):
+            self.client.get(reverse('tinnitus_log_detail', args=[log.id]))
+
+    def test_tinnitus_helper(self):
+        # 首次访问：用户、时辰查找表，生成快照的日记、提醒、日期
+        with self.assertNumQueries(5):
+            self.client.get(reverse('tinnitus_helper'))
+        # 之后只有用户
+        with self.assertNumQueries(1):
+            self.client.get(reverse('tinnitus_helper'))
+
+    def test_acupoint_pages(self):
+        acupoint = AcupointMassage.objects.first()
+        acupoint.related_time_slots.set(TimeSlot.objects.all()[:3])
+        with self.assertNumQueries(3):
+            self.client.get(reverse('acupoint_list'))
+        with self.assertNumQueries(3):
+            self.client.get(reverse('acupoint_detail', args=[acupoint.id]))
+        time_slots.get_index()
+        with self.assertNumQueries(2):
+            self.client.get(reverse('time_slot_detail', args=['wu']))
+
+    def test_admin_changelists(self):
+        self.client.force_login(self.admin)
+        # 日记：用户、时辰筛选项、一页数据、限量计数、超出后的估算
+        for model, queries in (('tinnituslog', 5), ('reminder', 5)):
+            with self.subTest(model=model):
+                with self.assertNumQueries(queries):
+                    self.client.get(reverse(f'admin:main_{model}_changelist'))
+
+    def test_admin_tinnituslog_keyset_pages(self):
+        self.client.force_login(self.admin)
+        url = reverse('admin:main_tinnituslog_changelist')
+        seen, params = [], {'severity__exact': 3}
+        while True:
+            response = self.client.get(url, params)
+            cl = response.context['cl']
+            seen.extend(log.id for log in cl.result_list)
+            if not cl.keyset_page.has_next:
+                break
+            params = {'severity__exact': 3, 'after': cl.keyset_page.next_cursor}
+        expected = list(TinnitusLog.objects.filter(severity=3).order_by('-date', '-id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+        self.assertContains(response, '较新')
+        # 按列排序时退回页码分页
+        response = self.client.get(url, {'o': '5', 'p': '2'})
+        self.assertIsNone(response.context['cl'].keyset_page)
+        self.assertEqual(len(response.context['cl'].result_list), 100)
+
+    def test_admin_tinnituslog_estimated_count(self):
+        self.client.force_login(self.admin)
+        with mock.patch.object(EstimatedCountPaginator, 'exact_limit', 100):
+            unfiltered = self.client.get(reverse('admin:main_tinnituslog_changelist'))
+            filtered = self.client.get(reverse('admin:main_tinnituslog_changelist'), {'severity__exact': 1})
+        self.assertFalse(unfiltered.context['cl'].paginator.count_is_exact)
+        if connection.vendor == 'sqlite':
+            # SQLite 未过滤时按最大主键估算，过滤后不估算
+            self.assertContains(unfiltered, f'约 {TinnitusLog.objects.order_by("-id").first().id} 耳鸣日记')
+            self.assertContains(filtered, '100 以上 耳鸣日记')
+        else:
+            self.assertContains(unfiltered, '约 ')
+            self.assertContains(filtered, '约 ')
+
+    def test_admin_tinnituslog_form_uses_autocomplete(self):
+        self.client.force_login(self.admin)
+        log = TinnitusLog.objects.first()
+        response = self.client.get(reverse('admin:main_tinnituslog_change', args=[log.id]))
+        self.assertContains(response, 'admin-autocomplete')
+        self.assertNotContains(response, '>admin</option>')
+
+
+class ReminderSettingsTests(SeededTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('reminded', password='pass12345')
+        self.client.force_login(self.user)
+        self.slots = list(TimeSlot.objects.order_by('start_time'))
+
+    def post_settings(self, active, messages=None):
+        data = {f'reminder_{slot.id}': 'on' for slot in active}
+        for slot, message in (messages or {}).items():
+            data[f'message_{slot.id}'] = message
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('reminder_settings'), data)
+        writes = [q['sql'] for q in queries if 'main_reminder' in q['sql'] and not q['sql'].startswith('SELECT')]
+        self.assertRedirects(response, reverse('reminder_settings'))
+        return writes
+
+    def test_changed_rows_written_in_one_statement(self):
+        writes = self.post_settings(self.slots[:3], {self.slots[5]: '午休'})
+        self.assertEqual(len(writes), 1)
+        self.assertEqual(Reminder.objects.filter(user=self.user).count(), 4)
+        self.assertEqual(Reminder.objects.filter(user=self.user, is_active=True).count(), 3)
+
+        writes = self.post_settings(self.slots[1:3], {self.slots[5]: '午休'})
+        self.assertEqual(len(writes), 1)
+        self.assertFalse(Reminder.objects.get(user=self.user, time_slot=self.slots[0]).is_active)
+
+    def test_unchanged_settings_cost_no_writes(self):
+        self.post_settings(self.slots[:3])
+        self.assertEqual(self.post_settings(self.slots[:3]), [])
+
+    def test_saved_settings_are_rendered(self):
+        self.post_settings(self.slots[:1], {self.slots[0]: '早睡'})
+        response = self.client.get(reverse('reminder_settings'))
+        self.assertContains(response, '早睡')
+        self.assertContains(response, 'card h-100 border-success', count=1)
+
+
+class DashboardTests(SeededTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('dashboard', password='pass12345')
+        self.client.force_login(self.user)
+        self.slots = list(TimeSlot.objects.order_by('start_time'))
+
+    def get_helper(self):
+        with self.assertNumQueries(1):
+            return self.client.get(reverse('tinnitus_helper'))
+
+    def test_diary_writes_refresh_snapshot(self):
+        self.client.get(reverse('tinnitus_helper'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('tinnitus_log_create'), {
+                'date': date.today().isoformat(), 'time_slot': self.slots[3].id, 'severity': 4,
+                'frequency': 'continuous', 'duration_minutes': 20, 'symptoms': '蝉鸣声',
+            })
+        response = self.get_helper()
+        self.assertContains(response, '蝉鸣声')
+        self.assertContains(response, self.slots[3].chinese_name)
+        self.assertContains(response, '已连续记录 1 天')
+
+        log = TinnitusLog.objects.get(user=self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            log.delete()
+        self.assertNotContains(self.get_helper(), '蝉鸣声')
+
+    def test_reminder_settings_refresh_snapshot(self):
+        self.client.get(reverse('tinnitus_helper'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('reminder_settings'), {
+                f'reminder_{self.slots[2].id}': 'on', f'message_{self.slots[2].id}': '按揉听宫',
+            })
+        response = self.get_helper()
+        self.assertContains(response, '已设置 1 个提醒')
+        self.assertContains(response, '按揉听宫')
+
+    def test_streak(self):
+        today = date.today()
+        with self.captureOnCommitCallbacks(execute=True):
+            for days_ago in (0, 1, 1, 2, 4):
+                TinnitusLog.objects.create(
+                    user=self.user, date=today - timedelta(days=days_ago), severity=2,
+                    frequency='occasional', duration_minutes=5,
+                )
+        self.assertEqual(dashboard.get_dashboard(self.user.id)['streak_days'], 3)
+        self.assertEqual(dashboard.get_dashboard(self.user.id, today + timedelta(days=1))['streak_days'], 3)
+        self.assertEqual(dashboard.get_dashboard(self.user.id, today + timedelta(days=2))['streak_days'], 0)
+
+
+class TinnitusStatsTests(SeededTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('stats', password='pass12345')
+        self.client.force_login(self.user)
+        self.wu = TimeSlot.objects.get(name='wu')
+        self.today = date.today()
+
+    def create_log(self, **kwargs):
+        values = {
+            'user': self.user, 'date': self.today, 'time_slot': self.wu, 'severity': 3,
+            'frequency': 'continuous', 'duration_minutes': 30,
+        }
+        values.update(kwargs)
+        return TinnitusLog.objects.create(**values)
+
+    def aggregate(self, slot_name='wu', day=None):
+        return TinnitusDailyAggregate.objects.get(user=self.user, date=day or self.today, slot_name=slot_name)
+
+    def test_aggregates_follow_create_update_delete(self):
+        first = self.create_log(severity=2, sleep_quality=6)
+        self.create_log(severity=5, duration_minutes=10)
+        row = self.aggregate()
+        self.assertEqual((row.log_count, row.severity_sum, row.severity_max, row.duration_sum), (2, 7, 5, 40))
+        self.assertEqual(row.sleep_quality_avg, 6)
+
+        first.time_slot = None
+        first.save()
+        self.assertEqual(self.aggregate().log_count, 1)
+        self.assertEqual(self.aggregate('').severity_max, 2)
+
+        first.delete()
+        self.assertFalse(TinnitusDailyAggregate.objects.filter(user=self.user, slot_name='').exists())
+
+    def test_unknown_slot_counted_in_empty_bucket(self):
+        # 进程内查找表尚未包含新时辰时，日记归入“未记录时辰”，重算该格时也不能丢掉
+        extra = TimeSlot.objects.create(
+            name='extra', chinese_name='附加', start_time=time(0, 0), end_time=time(0, 0), meridian='', organ='',
+        )
+        stale = time_slots.TimeSlotIndex(TimeSlot.objects.exclude(pk=extra.pk).order_by('start_time'))
+        with mock.patch.object(stats, 'get_index', return_value=stale):
+            self.create_log(time_slot=extra, severity=4)
+            stats.rebuild_range(self.user.id, self.today, self.today)
+            self.assertEqual(self.aggregate('').log_count, 1)
+            self.create_log(time_slot=None, severity=2).delete()
+            self.assertEqual(self.aggregate('').log_count, 1)
+
+    def test_stats_api_reads_aggregates_only(self):
+        for offset in range(10):
+            self.create_log(date=self.today - timedelta(days=offset), severity=offset % 5 + 1)
+        self.client.get(reverse('tinnitus_log_stats_api'))
+        with self.assertNumQueries(2):
+            data = self.client.get(reverse('tinnitus_log_stats_api'), {'days': 7}).json()
+        self.assertEqual(data['summary']['log_count'], 7)
+        self.assertEqual(data['active_days'], 7)
+        self.assertEqual(data['time_slots'][0]['slot'], 'wu')
+        self.assertContains(self.client.get(reverse('tinnitus_log_stats'), {'days': 365}), '最近 365 天')
+
+
+class TinnitusReportTests(SeededTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user = User.objects.create_user('report', password='pass12345')
+        logs = []
+        for day in range(60):
+            late_night = day % 2 == 0
+            logs.append(TinnitusLog(
+                user=cls.user, date=date(2025, 1, 1) + timedelta(days=day),
+                severity=5 if late_night else 1, frequency='continuous', duration_minutes=20,
+                triggers='熬夜，咖啡' if late_night else '咖啡', mood='焦虑' if late_night else '平静',
+                sleep_quality=2 if not late_night else 8,
+            ))
+        TinnitusLog.objects.bulk_create(logs)
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize('熬夜、咖啡; 熬夜  Stress'), ['熬夜', '咖啡', 'stress'])
+
+    def test_term_lift_and_sleep_correlation(self):
+        report = build_report(self.user.id)
+        triggers = {item['term']: item for item in report['fields'][0]['terms']}
+        self.assertEqual(triggers['熬夜']['lift'], round(5 / 3, 2))
+        self.assertEqual(triggers['咖啡']['lift'], 1.0)
+        self.assertEqual(triggers['熬夜']['next_day_severity_avg'], 1.0)
+        # 睡得差的第二天严重程度高
+        self.assertEqual(report['sleep_correlation'], -1.0)
+
+    def test_report_cached_until_next_write(self):
+        self.client.force_login(self.user)
+        url = reverse('tinnitus_log_report')
+        self.client.get(url)
+        with self.assertNumQueries(1):
+            self.assertContains(self.client.get(url), '熬夜')
+        TinnitusLog.objects.create(
+            user=self.user, date=date(2025, 3, 1), severity=5, frequency='continuous',
+            duration_minutes=5, triggers='噪音',
+        )
+        with self.assertNumQueries(2):
+            self.client.get(url)
+
+
+@quiet_slow_requests
+class TinnitusExportTests(SeededTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user = User.objects.create_user('exporter', password='pass12345')
+        wu = TimeSlot.objects.get(name='wu')
+        TinnitusLog.objects.bulk_create([
+            TinnitusLog(
+                user=cls.user, date=date(2025, 1, 1) + timedelta(days=i), time_slot=wu if i % 2 else None,
+                severity=3, frequency='occasional', duration_minutes=i, symptoms='蝉鸣, "高频"',
+            )
+            for i in range(30)
+        ])
+        TinnitusLog.objects.create(
+            user=User.objects.create_user('someone', password='pass12345'),
+            date=date(2025, 1, 1), severity=1, frequency='occasional', duration_minutes=1,
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+
+    def test_csv_export_streams_own_logs(self):
+        response = self.client.get(reverse('tinnitus_log_export_csv'))
+        self.assertTrue(response.streaming)
+        rows = list(csv.reader(b''.join(response.streaming_content).decode('utf-8-sig').splitlines()))
+        self.assertEqual(rows[0][:3], ['date', 'time_slot', 'time_slot_name'])
+        self.assertEqual(len(rows), 31)
+        self.assertEqual(rows[2][1:3], ['wu', '午时'])
+        self.assertEqual(rows[1][rows[0].index('symptoms')], '蝉鸣, "高频"')
+
+    def test_jsonl_export_does_not_join_time_slots(self):
+        time_slots.get_index()
+        response = self.client.get(reverse('tinnitus_log_export_jsonl'))
+        with CaptureQueriesContext(connection) as queries:
+            records = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(len(records), 30)
+        self.assertEqual(records[-1]['duration_minutes'], 29)
+        self.assertNotIn('main_timeslot', queries[0]['sql'])
+
+    def test_admin_export_action_covers_all_users(self):
+        self.client.force_login(User.objects.get(username='admin'))
+        response = self.client.post(reverse('admin:main_tinnituslog_changelist'), {
+            'action': 'export_as_csv',
+            '_selected_action': list(TinnitusLog.objects.values_list('id', flat=True)),
+        })
+        rows = list(csv.reader(b''.join(response.streaming_content).decode('utf-8-sig').splitlines()))
+        self.assertEqual(rows[0][0], 'username')
+        self.assertEqual({row[0] for row in rows[1:]}, {'exporter', 'someone'})
+
+
+@quiet_slow_requests
+class TinnitusImportTests(SeededTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('importer', password='pass12345')
+        self.client.force_login(self.user)
+
+    def upload(self, name, content):
+        return self.client.post(reverse('tinnitus_log_import'), {
+            'file': SimpleUploadedFile(name, content.encode('utf-8')),
+        })
+
+    def test_csv_import_with_row_errors(self):
+        rows = ['date,time_slot,severity,frequency,duration_minutes,triggers,sleep_quality']
+        for i in range(1200):
+            rows.append(f'2025-01-{i % 28 + 1:02d},{"午时" if i % 2 else "wu"},{i % 5 + 1},continuous,10,熬夜,')
+        rows.append('2025-02-01,noon,3,continuous,10,,')
+        rows.append('2025-02-01,,9,continuous,10,,')
+        response = self.upload('diary.csv', '\n'.join(rows))
+
+        result = response.context['result']
+        self.assertEqual(result.imported, 1200)
+        self.assertEqual([line for line, _ in result.errors], [1202, 1203])
+        self.assertIn('未知的时辰', result.errors[0][1])
+        self.assertEqual(TinnitusLog.objects.filter(user=self.user, time_slot__name='wu').count(), 1200)
+        self.assertEqual(
+            sum(TinnitusDailyAggregate.objects.filter(user=self.user).values_list('log_count', flat=True)), 1200
+        )
+
+    def test_non_string_time_slot_is_row_error(self):
+        lines = [
+            {'date': '2025-03-01', 'time_slot': 3, 'severity': 2, 'frequency': 'occasional', 'duration_minutes': 5},
+            {'date': '2025-03-02', 'time_slot': '午时', 'severity': 2, 'frequency': 'occasional', 'duration_minutes': 5},
+        ]
+        response = self.upload('diary.jsonl', '\n'.join(json.dumps(line, ensure_ascii=False) for line in lines))
+        result = response.context['result']
+        self.assertEqual(result.imported, 1)
+        self.assertEqual(result.errors, [(1, '未知的时辰：3')])
+
+    def test_gbk_csv(self):
+        content = 'date,time_slot,severity,frequency,duration_minutes,triggers\n2025-01-01,午时,3,continuous,10,熬夜\n'
+        response = self.client.post(reverse('tinnitus_log_import'), {
+            'file': SimpleUploadedFile('diary.csv', content.encode('gbk')),
+        })
+        self.assertRedirects(response, reverse('tinnitus_log_list'))
+        self.assertEqual(TinnitusLog.objects.get(user=self.user).triggers, '熬夜')
+
+        response = self.client.post(reverse('tinnitus_log_import'), {
+            'file': SimpleUploadedFile('diary.csv', content.encode('utf-8') + b'\xff\xff\x80'),
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertFormError(response.context['form'], 'file', '无法识别文件编码，请另存为 UTF-8 或 GBK 编码后重试')
+
+    def test_export_round_trip(self):
+        TinnitusLog.objects.create(
+            user=self.user, date=date(2025, 5, 1), time_slot=TimeSlot.objects.get(name='zi'),
+            severity=4, frequency='intermittent', duration_minutes=45, mood='烦躁', sleep_quality=3,
+        )
+        exported = b''.join(self.client.get(reverse('tinnitus_log_export_jsonl')).streaming_content)
+        TinnitusLog.objects.filter(user=self.user).delete()
+
+        response = self.upload('diary.jsonl', exported.decode('utf-8'))
+        self.assertRedirects(response, reverse('tinnitus_log_list'))
+        log = TinnitusLog.objects.get(user=self.user)
+        self.assertEqual((log.time_slot.name, log.severity, log.mood, log.sleep_quality), ('zi', 4, '烦躁', 3))
+
+
+class ReminderDispatchTests(SeededTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.slot = TimeSlot.objects.get(name='wu')
+        users = User.objects.bulk_create([
+            User(username=f'user{i}', email=f'user{i}@example.com' if i % 2 else '') for i in range(25)
+        ])
+        Reminder.objects.bulk_create([
+            Reminder(user=user, time_slot=cls.slot, is_active=i % 5 != 0, custom_message='按揉听宫' if i == 1 else '')
+            for i, user in enumerate(users)
+        ])
+        cls.boundary = datetime(2025, 1, 1, 11, 0)
+
+    def test_slot_boundary_wraps_midnight(self):
+        zi = TimeSlot.objects.get(name='zi')
+        self.assertEqual(reminders.slot_boundary(zi, datetime(2025, 1, 2, 0, 30)), datetime(2025, 1, 1, 23, 0))
+        self.assertEqual(reminders.slot_boundary(self.slot, datetime(2025, 1, 1, 12, 30)), self.boundary)
+
+    def test_inbox_dispatch_is_idempotent(self):
+        backend = reminders.InboxBackend()
+        dispatch = reminders.dispatch_slot(self.slot, self.boundary, backend, batch_size=4, workers=2)
+        self.assertEqual(dispatch.sent_count, 20)
+        self.assertEqual(ReminderMessage.objects.count(), 20)
+        self.assertTrue(ReminderMessage.objects.filter(content='按揉听宫').exists())
+
+        reminders.dispatch_slot(self.slot, self.boundary, backend)
+        self.assertEqual(ReminderMessage.objects.count(), 20)
+
+    def test_dispatch_resumes_from_checkpoint(self):
+        active = list(Reminder.objects.filter(is_active=True).order_by('id').values_list('id', flat=True))
+        ReminderDispatch.objects.create(time_slot=self.slot, boundary=self.boundary, last_reminder_id=active[11])
+        reminders.dispatch_slot(self.slot, self.boundary, reminders.InboxBackend(), batch_size=3)
+        self.assertEqual(ReminderMessage.objects.count(), 8)
+
+    def test_email_backend(self):
+        reminders.dispatch_slot(self.slot, self.boundary, reminders.EmailBackend(), batch_size=5, workers=3)
+        self.assertEqual(len(mail.outbox), 10)
+        self.assertEqual(mail.outbox[0].subject, '午时养生提醒')
+
+    def test_command_once(self):
+        out = StringIO()
+        call_command('dispatch_reminders', '--once', stdout=out)
+        self.assertIn('已发送', out.getvalue())
+
+    def test_command_retries_after_failure(self):
+        # 第一次发送失败后等待重试；第二次 sleep（等待下一时辰）时结束循环
+        command = 'main.management.commands.dispatch_reminders'
+        with mock.patch(f'{command}.Command.dispatch_current', side_effect=[OSError('SMTP 不可用'), None]) as dispatch, \
+                mock.patch(f'{command}.time.sleep', side_effect=[None, KeyboardInterrupt]) as sleep, \
+                mock.patch(f'{command}.close_old_connections'), \
+                self.assertLogs(command, 'ERROR'):
+            with self.assertRaises(KeyboardInterrupt):
+                call_command('dispatch_reminders', stdout=StringIO())
+        self.assertEqual(dispatch.call_count, 2)
+        self.assertEqual(sleep.call_args_list[0], mock.call(5))
+
+
+class TimeSlotEventsTests(SeededTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user = User.objects.create_user('listener', password='secret-pass-123')
+        cls.slot = TimeSlot.objects.get(name='wu')
+        Reminder.objects.create(user=cls.user, time_slot=cls.slot, custom_message='按揉听宫')
+
+    def test_wsgi_request_falls_back_to_polling(self):
+        response = self.client.get(reverse('time_slot_events'))
+        self.assertEqual(response.status_code, 204)
+
+    async def test_stream_starts_with_current_slot(self):
+        broadcaster = events.SlotBroadcaster()
+        with mock.patch.object(events, 'broadcaster', broadcaster):
+            response = await self.async_client.get(reverse('time_slot_events'))
+            self.assertEqual(response['Content-Type'], 'text/event-stream')
+            stream = aiter(response.streaming_content)
+            self.assertTrue((await anext(stream)).startswith(b'retry:'))
+            message = (await anext(stream)).decode('utf-8')
+            broadcaster._task.cancel()
+        slot = await sync_to_async(time_slots.current_time_slot)()
+        self.assertTrue(message.startswith('event: slot\n'))
+        self.assertIn(f'"name": "{slot.name}"', message)
+
+    async def test_publish_once_per_slot_with_due_reminders(self):
+        broadcaster = events.SlotBroadcaster()
+        listener = await broadcaster.subscribe(self.user.id)
+        anonymous = await broadcaster.subscribe()
+        broadcaster._task.cancel()
+        for subscriber in (listener, anonymous):
+            subscriber.queue.get_nowait()
+
+        now = datetime(2025, 1, 1, 11, 0, 1)
+        await broadcaster.publish(now)
+        await broadcaster.publish(now)
+
+        self.assertEqual(listener.queue.qsize(), 2)
+        self.assertEqual(anonymous.queue.qsize(), 1)
+        slot_message = listener.queue.get_nowait()
+        self.assertIs(slot_message, anonymous.queue.get_nowait())
+        self.assertIn('"name": "wu"', slot_message.decode('utf-8'))
+        reminder = listener.queue.get_nowait().decode('utf-8')
+        self.assertTrue(reminder.startswith('event: reminder\n'))
+        self.assertIn('按揉听宫', reminder)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'SQLite 专用配置')
+class SqliteProfileTests(SeededTestCase):
+
+    def test_pragmas_applied_to_new_connections(self):
+        # 开发和测试使用默认设置，按生产配置新建一个连接
+        path = Path(tempfile.mkdtemp(prefix='sqlite_profile_')) / 'db.sqlite3'
+        self.addCleanup(shutil.rmtree, path.parent, ignore_errors=True)
+        handler = ConnectionHandler({
+            'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': path, **settings.SQLITE_PRODUCTION_PROFILE},
+        })
+        profile_connection = handler['default']
+        self.addCleanup(profile_connection.close)
+        with profile_connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 20000)
+
+
+class AcupointImageVariantTests(SeededTestCase):
+
+    def add_source_image(self, name='shenmen.jpg'):
+        target = Path(settings.MEDIA_ROOT) / 'acupoints' / name
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy(Path(settings.BASE_DIR) / 'media' / 'acupoints' / name, target)
+        return f'acupoints/{name}'
+
+    def test_variants_generated_on_save(self):
+        acupoint = AcupointMassage.objects.get(name='神门')
+        self.assertEqual(acupoint.image_variants, {})
+
+        acupoint.image = self.add_source_image()
+        acupoint.save()
+        acupoint.refresh_from_db()
+        variants = acupoint.image_variants['variants']
+        # 原图宽 800，不放大
+        self.assertEqual([(v['label'], v['width']) for v in variants], [('thumb', 400), ('medium', 800)])
+        for variant in variants:
+            self.assertRegex(variant['webp'], r'^acupoints/variants/shenmen-\w+-[0-9a-f]{12}\.webp$')
+            self.assertTrue((Path(settings.MEDIA_ROOT) / variant['jpeg']).exists())
+
+        thumb = Path(settings.MEDIA_ROOT) / variants[0]['webp']
+        source = Path(settings.MEDIA_ROOT) / acupoint.image.name
+        self.assertLess(thumb.stat().st_size * 5, source.stat().st_size)
+
+        # 图片未变化时不重复生成
+        mtime = thumb.stat().st_mtime_ns
+        acupoint.save()
+        self.assertEqual(thumb.stat().st_mtime_ns, mtime)
+
+    def test_list_page_uses_srcset(self):
+        acupoint = AcupointMassage.objects.get(name='神门')
+        acupoint.image = self.add_source_image()
+        acupoint.save()
+        response = self.client.get(reverse('acupoint_list'))
+        self.assertContains(response, 'type="image/webp"')
+        self.assertContains(response, 'loading="lazy"')
+        self.assertContains(response, f'{settings.MEDIA_URL}acupoints/variants/shenmen-thumb-')
+        self.assertContains(response, ' 800w')
+
+    def test_backfill_command(self):
+        name = self.add_source_image('tingong.jpg')
+        AcupointMassage.objects.filter(name='听宫').update(image=name)
+        out = StringIO()
+        call_command('generate_image_variants', stdout=out)
+        self.assertIn('已处理 1 张', out.getvalue())
+        self.assertTrue(AcupointMassage.objects.get(name='听宫').image_variants['variants'])
+
+
+class StaticAssetPipelineTests(SimpleTestCase):
+
+    def test_collectstatic_outputs_hashed_compressed_immutable_files(self):
+        static_root = tempfile.mkdtemp(prefix='test_static_')
+        self.addCleanup(shutil.rmtree, static_root, ignore_errors=True)
+        storages = {
+            **settings.STORAGES,
+            'staticfiles': {'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage'},
+        }
+        with override_settings(STATIC_ROOT=static_root, STORAGES=storages):
+            call_command('collectstatic', '--noinput', verbosity=0)
+            url = static('css/style.css')
+            self.assertRegex(url, r'^/static/css/style\.[0-9a-f]{12}\.css$')
+            path = Path(static_root) / url.removeprefix('/static/')
+            # CSS 中引用的图片也替换为带哈希的文件名
+            self.assertRegex(path.read_text(encoding='utf-8'), r'images/taiji\.[0-9a-f]{12}\.svg')
+            for suffix in ('.gz', '.br'):
+                self.assertTrue(path.with_name(path.name + suffix).exists())
+
+            middleware = WhiteNoiseMiddleware(lambda request: HttpResponse(status=404))
+            response = middleware(RequestFactory().get(url, HTTP_ACCEPT_ENCODING='gzip, br'))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['Content-Encoding'], 'br')
+            self.assertIn('immutable', response['Cache-Control'])
+            self.assertIn('max-age=315360000', response['Cache-Control'])
+            response.close()
+
+
+class ServeCommandTests(SimpleTestCase):
+
+    def test_gunicorn_command(self):
+        argv, env = gunicorn_command('wsgi', '127.0.0.1:9000', 3, access_log=False)
+        self.assertEqual(argv[1:3], ['-m', 'gunicorn'])
+        self.assertIn(str(settings.BASE_DIR / 'gunicorn.conf.py'), argv)
+        self.assertEqual(argv[argv.index('--workers') + 1], '3')
+        self.assertEqual(argv[-1], 'tinnitus_health.wsgi:application')
+        self.assertEqual(env['GUNICORN_MODE'], 'wsgi')
+
+    def load_production_settings(self, **environ):
+        environ = {'DJANGO_SECRET_KEY': 'test', **environ}
+        with mock.patch.dict(os.environ, environ):
+            for name in ('DJANGO_CACHE_DIR', 'DJANGO_CONN_MAX_AGE', 'GUNICORN_MODE'):
+                if name not in environ:
+                    os.environ.pop(name, None)
+            return importlib.reload(importlib.import_module('tinnitus_health.settings_prod'))
+
+    def test_production_caches_shared_between_workers(self):
+        prod = self.load_production_settings()
+        for alias in ('default', 'sessions'):
+            self.assertEqual(prod.CACHES[alias]['BACKEND'], 'django.core.cache.backends.filebased.FileBasedCache')
+        self.assertEqual(prod.CACHES['default']['LOCATION'], str(settings.BASE_DIR / 'cache'))
+        prod = self.load_production_settings(DJANGO_CACHE_DIR='/var/cache/tinnitus')
+        self.assertEqual(prod.CACHES['sessions']['LOCATION'], '/var/cache/tinnitus/sessions')
+
+    def test_whitenoise_only_in_production(self):
+        prod = self.load_production_settings()
+        security = prod.MIDDLEWARE.index('django.middleware.security.SecurityMiddleware')
+        self.assertEqual(prod.MIDDLEWARE[security + 1], 'whitenoise.middleware.WhiteNoiseMiddleware')
+        self.assertNotIn('whitenoise.middleware.WhiteNoiseMiddleware', settings.MIDDLEWARE)
+
+    def test_asgi_mode_disables_persistent_connections(self):
+        self.assertEqual(gunicorn_command()[1]['GUNICORN_MODE'], 'wsgi')
+        prod = self.load_production_settings(GUNICORN_MODE='asgi')
+        self.assertEqual(prod.DATABASES['default']['CONN_MAX_AGE'], 0)
+        # 明确指定 DJANGO_CONN_MAX_AGE 时与 WSGI 模式相同
+        wsgi_max_age = self.load_production_settings().DATABASES['default']['CONN_MAX_AGE']
+        prod = self.load_production_settings(GUNICORN_MODE='asgi', DJANGO_CONN_MAX_AGE='60')
+        self.assertEqual(prod.DATABASES['default']['CONN_MAX_AGE'], wsgi_max_age)
+
+    @skipUnless(connection.vendor == 'sqlite', 'SQLite 生产配置')
+    def test_sqlite_profile_only_in_production(self):
+        self.assertNotIn('PRAGMAS', settings.DATABASES['default'])
+        prod = self.load_production_settings()
+        self.assertEqual(prod.DATABASES['default']['PRAGMAS'], settings.SQLITE_PRODUCTION_PROFILE['PRAGMAS'])
+        self.assertEqual(prod.DATABASES['default']['OPTIONS'], {'transaction_mode': 'IMMEDIATE'})
+
+
+class ScannerBlockMiddlewareTests(SeededTestCase):
+
+    def test_probes_rejected_before_routing(self):
+        probes = ['/.env', '/api/.env.bak', '/.git/config', '/wp-login.php', '/actuator/health', '/static../etc/passwd', '/../etc/passwd']
+        with CaptureQueriesContext(connection) as queries:
+            for path in probes:
+                response = self.client.get(path)
+                self.assertEqual(response.status_code, 404, path)
+                self.assertEqual(response.content, b'')
+                self.assertNotIn('sessionid', response.cookies)
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(self.client.get('/', {'XDEBUG_SESSION_START': 'phpstorm'}).status_code, 404)
+        self.assertEqual(self.client.generic('PROPFIND', '/').status_code, 405)
+
+    def test_regular_pages_pass(self):
+        for name in ['home', 'acupoint_list', 'current_time_slot_api', 'tinnitus_log_export_csv', 'login']:
+            self.assertIn(self.client.get(reverse(name)).status_code, (200, 302))
+        self.assertNotEqual(self.client.get('/.well-known/acme-challenge/token').content, b'')
+        # 路径中普通的 ".." 不属于路径穿越
+        self.assertEqual(self.client.get('/acupoints/v1..2/').status_code, 404)
+        self.assertNotEqual(self.client.get('/acupoints/v1..2/').content, b'')
+        self.assertEqual(self.client.get(reverse('acupoint_list'), {'q': 'a..b'}).status_code, 200)
+
+    def test_scanning_address_not_locked_out(self):
+        for _ in range(50):
+            self.assertEqual(self.client.get('/.env').status_code, 404)
+        # 同一地址（如代理或 NAT 之后）的正常请求不受影响
+        self.assertEqual(self.client.get(reverse('home')).status_code, 200)
+
+
+class MetricsTests(SeededTestCase):
+
+    def setUp(self):
+        super().setUp()
+        metrics.reset()
+
+    def test_metrics_endpoint_staff_only(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 302)
+        self.client.force_login(User.objects.create_user('visitor', password='pass12345'))
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 302)
+        self.client.force_login(User.objects.create_user('ops', password='pass12345', is_staff=True))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+
+    def test_records_latency_queries_and_templates(self):
+        self.client.get(reverse('acupoint_list'))
+        self.client.get(reverse('acupoint_list'))
+        stats = metrics.view_stats['acupoint_list']
+        self.assertEqual(stats.requests, 2)
+        self.assertGreater(stats.queries, 0)
+        self.assertGreater(stats.sql_seconds, 0)
+        self.assertGreater(stats.template_seconds, 0)
+
+        self.client.force_login(User.objects.create_user('ops', password='pass12345', is_staff=True))
+        body = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn('tinnitus_http_request_duration_seconds_bucket{view="acupoint_list",le="+Inf"} 2', body)
+        self.assertIn('tinnitus_http_responses_total{view="acupoint_list",method="GET",status="200"} 2', body)
+        self.assertIn(f'tinnitus_sql_queries_total{{view="acupoint_list"}} {stats.queries}', body)
+        self.assertIn('tinnitus_template_render_seconds_total{view="acupoint_list"}', body)
+
+    @override_settings(METRICS_SLOW_REQUEST_SECONDS=0)
+    def test_slow_request_logged_with_queries(self):
+        with self.assertLogs('main.metrics', 'WARNING') as logs:
+            self.client.get(reverse('acupoint_list'))
+        self.assertIn('/acupoints/', logs.output[0])
+        self.assertIn('SELECT', logs.output[0])
+
+
+@quiet_slow_requests
+class BenchmarkCommandTests(SeededTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        call_command('init_data', users=2, logs_per_user=30, reminders=True, stdout=StringIO())
+
+    def test_init_data_seeds_bench_users(self):
+        users = User.objects.filter(username__startswith='bench_user_')
+        self.assertEqual(users.count(), 2)
+        self.assertEqual(TinnitusLog.objects.filter(user__in=users).count(), 60)
+        self.assertEqual(Reminder.objects.filter(user__in=users, is_active=True).count(), 24)
+        user = users.first()
+        self.assertEqual(
+            sum(TinnitusDailyAggregate.objects.filter(user=user).values_list('log_count', flat=True)), 30
+        )
+        # 再次运行不会重复生成
+        call_command('init_data', users=2, logs_per_user=30, stdout=StringIO())
+        self.assertEqual(TinnitusLog.objects.filter(user__in=users).count(), 60)
+
+    def test_benchmark_reports_json_and_detects_regressions(self):
+        output = Path(tempfile.mkdtemp(prefix='bench_')) / 'result.json'
+        self.addCleanup(shutil.rmtree, output.parent, ignore_errors=True)
+        call_command('benchmark', iterations=3, warmup=1, output=str(output), stderr=StringIO())
+        result = json.loads(output.read_text(encoding='utf-8'))
+        self.assertEqual(result['environment']['users'], 2)
+        for name in ['home', 'current_time_slot_api', 'tinnitus_log_list', 'tinnitus_log_create', 'reminder_settings']:
+            journey = result['client'][name]
+            self.assertEqual(journey['requests'], 3)
+            self.assertEqual(journey['errors'], 0, name)
+            self.assertLessEqual(journey['p50_ms'], journey['p99_ms'])
+        self.assertGreater(result['client']['tinnitus_log_create']['queries_max'], 0)
+
+        result['client']['tinnitus_log_list']['queries_max'] -= 1
+        baseline = output.parent / 'baseline.json'
+        baseline.write_text(json.dumps(result), encoding='utf-8')
+        with self.assertRaisesMessage(CommandError, 'client.tinnitus_log_list: SQL'):
+            call_command('benchmark', iterations=3, warmup=1, output=str(output), baseline=str(baseline))
+
+
+class SearchTests(SeededTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('searcher', password='pass12345')
+        self.other = User.objects.create_user('neighbour', password='pass12345')
+        self.slot = TimeSlot.objects.get(name='zi')
+        self.log = TinnitusLog.objects.create(
+            user=self.user, date=date(2025, 3, 1), time_slot=self.slot, severity=3,
+            frequency='continuous', duration_minutes=30, symptoms='夜间耳鸣加重，伴随失眠', triggers='熬夜 Coffee',
+        )
+        TinnitusLog.objects.create(
+            user=self.other, date=date(2025, 3, 1), time_slot=self.slot, severity=2,
+            frequency='continuous', duration_minutes=10, symptoms='失眠多梦',
+        )
+
+    def test_tokenize_uses_cjk_bigrams(self):
+        self.assertEqual(search.tokenize('耳鸣严重, 按摩Taichong'), '耳鸣 鸣严 严重 重 按摩 摩 taichong')
+
+    def test_acupoint_search(self):
+        self.assertEqual(search.search_acupoints('听宫')[0].name, '听宫')
+        # 单字按前缀匹配，多字要求相邻
+        self.assertTrue(search.search_acupoints('耳'))
+        self.assertFalse(search.search_acupoints('宫听'))
+        response = self.client.get(reverse('search'), {'q': '听宫'})
+        self.assertContains(response, reverse('acupoint_detail', args=[search.search_acupoints('听宫')[0].id]))
+        self.assertNotContains(response, '我的日记（')
+
+    def test_diary_search_is_per_user_and_incremental(self):
+        self.assertEqual(search.search_logs(self.user, '失眠'), [self.log])
+        self.assertEqual(search.search_logs(self.user, '耳鸣 coff'), [self.log])
+        self.assertEqual(search.search_logs(self.user, '多梦'), [])
+
+        self.log.symptoms = '头晕'
+        self.log.save()
+        self.assertEqual(search.search_logs(self.user, '失眠'), [])
+        self.assertEqual(search.search_logs(self.user, '头晕'), [self.log])
+        self.log.delete()
+        self.assertEqual(search.search_logs(self.user, '头晕'), [])
+
+        self.client.force_login(self.other)
+        response = self.client.get(reverse('search'), {'q': '失眠'})
+        self.assertEqual([log.user_id for log in response.context['logs']], [self.other.id])
+
+    def test_imported_logs_are_indexed(self):
+        upload = SimpleUploadedFile(
+            'logs.jsonl', json.dumps({
+                'date': '2025-03-02', 'severity': 2, 'frequency': 'occasional', 'duration_minutes': 5,
+                'notes': '咖啡后耳鸣',
+            }, ensure_ascii=False).encode('utf-8'),
+        )
+        self.client.force_login(self.user)
+        self.client.post(reverse('tinnitus_log_import'), {'file': upload})
+        self.assertEqual(len(search.search_logs(self.user, '咖啡')), 1)
+
+    def test_admin_search_uses_index(self):
+        self.client.force_login(User.objects.create_superuser('root', password='pass12345'))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('admin:main_tinnituslog_changelist'), {'q': '失眠'})
+        self.assertEqual(response.context['cl'].result_count, 2)
+        # 文本字段走全文索引，只有用户名按前缀 LIKE 匹配
+        self.assertFalse([q['sql'] for q in queries if '"main_tinnituslog"."symptoms" LIKE' in q['sql']])
+
+    def test_admin_search_matches_username_prefix(self):
+        self.client.force_login(User.objects.create_superuser('root', password='pass12345'))
+        response = self.client.get(reverse('admin:main_tinnituslog_changelist'), {'q': 'Search'})
+        self.assertEqual(list(response.context['cl'].result_list), [self.log])
+        response = self.client.get(reverse('admin:main_tinnituslog_changelist'), {'q': 'archer'})
+        self.assertEqual(response.context['cl'].result_count, 0)
+
+
+class SessionTests(SeededTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('sessioned', password='pass12345')
+
+    def test_logged_in_requests_read_session_from_cache(self):
+        self.client.login(username='sessioned', password='pass12345')
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('tinnitus_log_list'))
+        self.assertFalse([q['sql'] for q in queries if 'django_session' in q['sql']])
+
+        self.client.logout()
+        response = self.client.get(reverse('tinnitus_log_list'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_messages_do_not_write_session(self):
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('reminder_settings'), {})
+        self.assertIn('messages', response.cookies)
+        self.assertFalse([q['sql'] for q in queries if 'django_session' in q['sql']])
+
+    def test_purge_sessions_in_batches(self):
+        now = timezone.now()
+        Session.objects.bulk_create([
+            Session(session_key=f'expired{i}', session_data='', expire_date=now - timedelta(days=1)) for i in range(5)
+        ] + [Session(session_key='valid', session_data='', expire_date=now + timedelta(days=1))])
+        out = StringIO()
+        call_command('purge_sessions', batch_size=2, pause=0, max_batches=2, stdout=out)
+        self.assertIn('已删除 4 条', out.getvalue())
+        call_command('purge_sessions', batch_size=2, pause=0, stdout=out)
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)), ['valid'])
+
+    def test_bench_sessions_command(self):
+        out = StringIO()
+        call_command('bench_sessions', iterations=3, stdout=out)
+        self.assertIn('cached_db', out.getvalue())
+        self.assertIn('signed_cookies', out.getvalue())
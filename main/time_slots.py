@@ -0,0 +1,111 @@
+"""十二时辰查找表
+
+进程内缓存全部时辰，并预先计算一天 1440 分钟到时辰的映射表，
+按当前时间定位时辰时无需查询数据库。
+时辰被修改或删除时由信号（见 signals.py）使查找表失效。
+"""
+import threading
+import time as _time
+from bisect import bisect_right
+from datetime import datetime
+
+from django.conf import settings
+
+from .models import TimeSlot
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def _minute_of_day(value):
+    return value.hour * 60 + value.minute
+
+
+class TimeSlotIndex:
+    """时辰查找表"""
+
+    def __init__(self, slots):
+        self.slots = list(slots)
+        self.by_name = {slot.name: slot for slot in self.slots}
+        self.by_id = {slot.id: slot for slot in self.slots}
+
+        # 每分钟对应的时辰，跨日时段（如子时23:00-01:00）绕回表头
+        table = [None] * MINUTES_PER_DAY
+        for slot in self.slots:
+            start = _minute_of_day(slot.start_time)
+            end = _minute_of_day(slot.end_time)
+            minute = start
+            while True:
+                table[minute] = slot
+                minute = (minute + 1) % MINUTES_PER_DAY
+                if minute == end or minute == start:
+                    break
+        self.minute_table = table
+
+        # 时辰切换的分钟点，用于计算距下一次切换的时间
+        self.boundaries = [
+            minute for minute in range(MINUTES_PER_DAY)
+            if table[minute] is not table[minute - 1]
+        ]
+
+    def current(self, now=None):
+        """返回给定时间所在的时辰"""
+        now = now or datetime.now()
+        return self.minute_table[_minute_of_day(now)]
+
+    def seconds_until_change(self, now=None):
+        """距下一次时辰切换的秒数"""
+        now = now or datetime.now()
+        if not self.boundaries:
+            return None
+        seconds = now.hour * 3600 + now.minute * 60 + now.second
+        position = bisect_right(self.boundaries, seconds // 60)
+        if position < len(self.boundaries):
+            boundary = self.boundaries[position] * 60
+        else:
+            boundary = self.boundaries[0] * 60 + MINUTES_PER_DAY * 60
+        return boundary - seconds
+
+
+_index = None
+_loaded_at = 0.0
+_lock = threading.Lock()
+
+
+def get_index():
+    """获取进程内的时辰查找表，必要时从数据库加载"""
+    global _index, _loaded_at
+    max_age = getattr(settings, 'TIME_SLOT_INDEX_MAX_AGE', 300)
+    index = _index
+    if index is None or _time.monotonic() - _loaded_at > max_age:
+        with _lock:
+            if _index is None or _time.monotonic() - _loaded_at > max_age:
+                index = TimeSlotIndex(TimeSlot.objects.order_by('start_time'))
+                # 尚未初始化时辰数据时不缓存空表
+                _index = index if index.slots else None
+                _loaded_at = _time.monotonic()
+            else:
+                index = _index
+    return index
+
+
+def invalidate():
+    """使查找表失效，下次访问时重新加载"""
+    global _index
+    _index = None
+
+
+def current_time_slot(now=None):
+    """获取当前时辰"""
+    return get_index().current(now)
+
+
+def slot_payload(slot):
+    """时辰信息的 JSON 数据，供接口和事件推送共用"""
+    return {
+        'name': slot.name,
+        'chinese_name': slot.chinese_name,
+        'meridian': slot.meridian,
+        'organ': slot.organ,
+        'health_tips': slot.health_tips,
+        'end_time': slot.end_time.strftime('%H:%M'),
+    }
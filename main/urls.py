@@ -9,11 +9,19 @@ urlpatterns = [
     # 时辰相关
     path('time-slot/<str:slot_name>/', views.time_slot_detail, name='time_slot_detail'),
     path('api/current-time-slot/', views.get_current_time_slot, name='current_time_slot_api'),
+    path('api/events/', views.time_slot_events, name='time_slot_events'),
     
     # 耳鸣养生助手
     path('tinnitus-helper/', views.tinnitus_helper, name='tinnitus_helper'),
     path('tinnitus-log/create/', views.tinnitus_log_create, name='tinnitus_log_create'),
     path('tinnitus-log/list/', views.tinnitus_log_list, name='tinnitus_log_list'),
+    path('tinnitus-log/<int:log_id>/detail/', views.tinnitus_log_detail, name='tinnitus_log_detail'),
+    path('tinnitus-log/stats/', views.tinnitus_log_stats, name='tinnitus_log_stats'),
+    path('api/tinnitus-log/stats/', views.tinnitus_log_stats_api, name='tinnitus_log_stats_api'),
+    path('tinnitus-log/report/', views.tinnitus_log_report, name='tinnitus_log_report'),
+    path('tinnitus-log/export.csv', views.tinnitus_log_export, {'fmt': 'csv'}, name='tinnitus_log_export_csv'),
+    path('tinnitus-log/export.jsonl', views.tinnitus_log_export, {'fmt': 'jsonl'}, name='tinnitus_log_export_jsonl'),
+    path('tinnitus-log/import/', views.tinnitus_log_import, name='tinnitus_log_import'),
     
     # 提醒设置
     path('reminder-settings/', views.reminder_settings, name='reminder_settings'),
@@ -22,6 +30,9 @@ urlpatterns = [
     path('acupoints/', views.acupoint_list, name='acupoint_list'),
     path('acupoints/<int:acupoint_id>/', views.acupoint_detail, name='acupoint_detail'),
     
+    # 全文检索
+    path('search/', views.search, name='search'),
+    
     # 用户相关
     path('profile/', views.profile, name='profile'),
     path('register/', views.register, name='register'),
@@ -37,4 +48,7 @@ urlpatterns = [
     
     # 关于我们
     path('about/', views.about, name='about'),
+
+    # 运行统计（Prometheus）
+    path('metrics', views.metrics, name='metrics'),
 ]
\ No newline at end of file
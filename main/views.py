@@ -1,51 +1,67 @@
 from django.shortcuts import render, get_object_or_404, redirect
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import login, authenticate
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib import messages
-from django.http import JsonResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, Http404, StreamingHttpResponse
 from django.utils import timezone
-from django.db.models import Q
-from datetime import datetime, time
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.db import transaction
+from django.db.models import Q, Sum
+from datetime import datetime, time, timedelta
 import json
 
-from .models import TimeSlot, TinnitusLog, Reminder, AcupointMassage, UserProfile
-from .forms import TinnitusLogForm, ReminderForm, UserProfileForm
+from .models import TinnitusLog, TinnitusDailyAggregate, Reminder, AcupointMassage, UserProfile
+from .forms import TinnitusLogForm, TinnitusLogImportForm, ReminderForm, UserProfileForm
+from .time_slots import get_index, current_time_slot, slot_payload
+from .caching import anonymous_cache_page, get_content_version
+from .dashboard import get_dashboard, refresh_on_commit
+from .pagination import KeysetPaginator
+from .stats import STATS_WINDOWS, DEFAULT_STATS_WINDOW, user_stats
+from .reports import user_report
+from .export import export_response
+from .importer import import_logs
+from .events import event_stream
+from .metrics import render_prometheus
+from .search import search_acupoints, search_logs
 
+# 日记列表每页条数
+LOG_PAGE_SIZE = 20
+# 无法计算下一次时辰切换（时辰数据缺失或只有一个全天时辰）时时辰接口的缓存秒数
+SLOT_FALLBACK_MAX_AGE = 60
 
+
+@anonymous_cache_page(
+    key_func=lambda request: getattr(current_time_slot(), 'name', ''),
+    timeout=lambda: get_index().seconds_until_change(),
+)
 def home(request):
     """首页视图"""
-    # 获取所有时辰信息，按时间排序
-    time_slots = TimeSlot.objects.all().order_by('start_time')
-    
-    # 获取当前时辰
-    current_time = datetime.now().time()
-    current_time_slot = None
-    
-    for slot in time_slots:
-        # 处理跨日的时间段（如子时23:00-01:00）
-        if slot.start_time > slot.end_time:
-            if current_time >= slot.start_time or current_time < slot.end_time:
-                current_time_slot = slot
-                break
-        else:
-            if slot.start_time <= current_time < slot.end_time:
-                current_time_slot = slot
-                break
+    # 时辰信息来自进程内查找表，无需查询数据库
+    index = get_index()
     
     context = {
-        'time_slots': time_slots,
-        'current_time_slot': current_time_slot,
+        'time_slots': index.slots,
+        'current_time_slot': index.current(),
+        'content_version': get_content_version(),
     }
     return render(request, 'main/home.html', context)
 
 
+@anonymous_cache_page()
 def time_slot_detail(request, slot_name):
     """时辰详情视图"""
-    time_slot = get_object_or_404(TimeSlot, name=slot_name)
+    time_slot = get_index().by_name.get(slot_name)
+    if time_slot is None:
+        raise Http404('未找到该时辰')
     
     # 获取相关穴位
-    related_acupoints = AcupointMassage.objects.filter(related_time_slots=time_slot)
+    related_acupoints = AcupointMassage.objects.filter(related_time_slots=time_slot).only(
+        'id', 'name', 'body_part', 'benefits'
+    )
     
     context = {
         'time_slot': time_slot,
@@ -57,16 +73,8 @@ def time_slot_detail(request, slot_name):
 def tinnitus_helper(request):
     """耳鸣养生助手首页"""
     if request.user.is_authenticated:
-        # 获取用户最近的耳鸣记录
-        recent_logs = TinnitusLog.objects.filter(user=request.user).order_by('-date')[:5]
-        
-        # 获取用户的提醒设置
-        reminders = Reminder.objects.filter(user=request.user, is_active=True)
-        
-        context = {
-            'recent_logs': recent_logs,
-            'reminders': reminders,
-        }
+        # 最近日记、有效提醒和连续记录天数取自缓存中的用户快照
+        context = get_dashboard(request.user.id)
     else:
         context = {}
     
@@ -93,48 +101,150 @@ def tinnitus_log_create(request):
 
 @login_required
 def tinnitus_log_list(request):
-    """耳鸣日记列表"""
-    logs = TinnitusLog.objects.filter(user=request.user).order_by('-date')
-    context = {'logs': logs}
+    """耳鸣日记列表（游标分页，详情按需加载）"""
+    logs = TinnitusLog.objects.filter(user=request.user)
+    paginator = KeysetPaginator(logs.select_related('time_slot'), keys=('date', 'created_at', 'id'), per_page=LOG_PAGE_SIZE)
+    page = paginator.page(after=request.GET.get('after'), before=request.GET.get('before'))
+    
+    # 总数和本月数取自每日汇总，不随历史日记数量变慢
+    month_start = datetime.now().date().replace(day=1)
+    counts = TinnitusDailyAggregate.objects.filter(user=request.user).aggregate(
+        total=Sum('log_count'), month=Sum('log_count', filter=Q(date__gte=month_start)),
+    )
+    context = {
+        'logs': page,
+        'total_count': counts['total'] or 0,
+        'month_count': counts['month'] or 0,
+    }
     return render(request, 'main/tinnitus_log_list.html', context)
 
 
+@login_required
+def tinnitus_log_detail(request, log_id):
+    """耳鸣日记详情片段，供列表页模态框按需加载"""
+    log = get_object_or_404(TinnitusLog.objects.select_related('time_slot'), id=log_id, user=request.user)
+    return render(request, 'main/tinnitus_log_detail.html', {'log': log})
+
+
+def _stats_window(request):
+    """从请求中解析统计窗口天数"""
+    try:
+        days = int(request.GET.get('days', DEFAULT_STATS_WINDOW))
+    except ValueError:
+        return DEFAULT_STATS_WINDOW
+    return days if days in STATS_WINDOWS else DEFAULT_STATS_WINDOW
+
+
+@login_required
+def tinnitus_log_stats(request):
+    """耳鸣日记统计"""
+    context = {
+        'stats': user_stats(request.user, _stats_window(request)),
+        'windows': STATS_WINDOWS,
+    }
+    return render(request, 'main/tinnitus_log_stats.html', context)
+
+
+@login_required
+def tinnitus_log_stats_api(request):
+    """API：耳鸣日记统计"""
+    return JsonResponse(user_stats(request.user, _stats_window(request)))
+
+
+@login_required
+def tinnitus_log_report(request):
+    """耳鸣日记关联分析报告"""
+    context = {'report': user_report(request.user.id)}
+    return render(request, 'main/tinnitus_log_report.html', context)
+
+
+@login_required
+def tinnitus_log_export(request, fmt):
+    """导出全部耳鸣日记（CSV 或 JSONL）"""
+    logs = TinnitusLog.objects.filter(user=request.user)
+    filename = f'tinnitus-log-{datetime.now():%Y%m%d}'
+    return export_response(logs, fmt, filename)
+
+
+@login_required
+def tinnitus_log_import(request):
+    """批量导入耳鸣日记"""
+    result = None
+    if request.method == 'POST':
+        form = TinnitusLogImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            try:
+                result = import_logs(request.user, form.cleaned_data['file'])
+            except UnicodeDecodeError:
+                form.add_error('file', '无法识别文件编码，请另存为 UTF-8 或 GBK 编码后重试')
+            else:
+                if result.imported:
+                    messages.success(request, f'成功导入 {result.imported} 条日记！')
+                if not result.error_count:
+                    return redirect('tinnitus_log_list')
+    else:
+        form = TinnitusLogImportForm()
+    
+    context = {'form': form, 'result': result}
+    return render(request, 'main/tinnitus_log_import.html', context)
+
+
 @login_required(login_url='tinnitus_helper')
 def reminder_settings(request):
     """提醒设置"""
-    time_slots = TimeSlot.objects.all()
+    time_slots = get_index().slots
     user_reminders = {r.time_slot_id: r for r in Reminder.objects.filter(user=request.user)}
     
     if request.method == 'POST':
+        # 只写入有变化的提醒，在同一事务中批量插入或更新
+        changed = []
         for slot in time_slots:
             is_active = request.POST.get(f'reminder_{slot.id}') == 'on'
             custom_message = request.POST.get(f'message_{slot.id}', '')
             
-            reminder, created = Reminder.objects.get_or_create(
+            reminder = user_reminders.get(slot.id)
+            if reminder is None:
+                if not is_active and not custom_message:
+                    continue
+            elif reminder.is_active == is_active and reminder.custom_message == custom_message:
+                continue
+            
+            changed.append(Reminder(
                 user=request.user,
                 time_slot=slot,
-                defaults={'is_active': is_active, 'custom_message': custom_message}
-            )
-            
-            if not created:
-                reminder.is_active = is_active
-                reminder.custom_message = custom_message
-                reminder.save()
+                is_active=is_active,
+                custom_message=custom_message,
+            ))
+        
+        if changed:
+            with transaction.atomic():
+                Reminder.objects.bulk_create(
+                    changed,
+                    update_conflicts=True,
+                    unique_fields=['user', 'time_slot'],
+                    update_fields=['is_active', 'custom_message', 'updated_at'],
+                )
+                # bulk_create 不触发信号
+                refresh_on_commit(request.user.id)
         
         messages.success(request, '提醒设置已更新！')
         return redirect('reminder_settings')
     
     context = {
         'time_slots': time_slots,
-        'user_reminders': user_reminders,
+        'slot_reminders': [(slot, user_reminders.get(slot.id)) for slot in time_slots],
     }
     return render(request, 'main/reminder_settings.html', context)
 
 
+@anonymous_cache_page(query_params={'body_part': ['', *dict(AcupointMassage.BODY_PARTS)]})
 def acupoint_list(request):
     """穴位列表"""
+    # 未知的部位按全部穴位显示，也不会出现在片段缓存键中
     body_part = request.GET.get('body_part')
-    acupoints = AcupointMassage.objects.all()
+    if body_part not in dict(AcupointMassage.BODY_PARTS):
+        body_part = None
+    acupoints = AcupointMassage.objects.prefetch_related('related_time_slots')
     
     if body_part:
         acupoints = acupoints.filter(body_part=body_part)
@@ -143,22 +253,42 @@ def acupoint_list(request):
         'acupoints': acupoints,
         'body_parts': AcupointMassage.BODY_PARTS,
         'selected_body_part': body_part,
+        'content_version': get_content_version(),
     }
     return render(request, 'main/acupoint_list.html', context)
 
 
+@anonymous_cache_page()
 def acupoint_detail(request, acupoint_id):
     """穴位详情"""
-    acupoint = get_object_or_404(AcupointMassage, id=acupoint_id)
+    acupoint = get_object_or_404(AcupointMassage.objects.prefetch_related('related_time_slots'), id=acupoint_id)
     context = {'acupoint': acupoint}
     return render(request, 'main/acupoint_detail.html', context)
 
 
+def search(request):
+    """全文检索穴位及当前用户自己的日记"""
+    query = request.GET.get('q', '').strip()[:100]
+    acupoints = search_acupoints(query) if query else []
+    logs = search_logs(request.user, query) if query and request.user.is_authenticated else []
+    context = {'query': query, 'acupoints': acupoints, 'logs': logs}
+    return render(request, 'main/search.html', context)
+
+
+@anonymous_cache_page()
 def about(request):
     """关于我们页面"""
     return render(request, 'main/about.html')
 
 
+@staff_member_required
+def metrics(request):
+    """本进程的请求、SQL 和模板统计（Prometheus 文本格式），仅管理员可见"""
+    response = HttpResponse(render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+    patch_cache_control(response, no_store=True)
+    return response
+
+
 # @login_required
 def profile(request):
     """用户资料"""
@@ -198,30 +328,49 @@ def register(request):
 
 
 def get_current_time_slot(request):
-    """API：获取当前时辰信息"""
-    current_time = datetime.now().time()
-    time_slots = TimeSlot.objects.all()
-    
-    current_slot = None
-    for slot in time_slots:
-        if slot.start_time > slot.end_time:  # 跨日时间段
-            if current_time >= slot.start_time or current_time < slot.end_time:
-                current_slot = slot
-                break
-        else:
-            if slot.start_time <= current_time < slot.end_time:
-                current_slot = slot
-                break
-    
-    if current_slot:
-        data = {
-            'name': current_slot.name,
-            'chinese_name': current_slot.chinese_name,
-            'meridian': current_slot.meridian,
-            'organ': current_slot.organ,
-            'health_tips': current_slot.health_tips,
-        }
-    else:
-        data = {'error': '未找到当前时辰信息'}
+    """API：获取当前时辰信息
+    
+    响应在下一次时辰切换前都可被浏览器缓存（Expires 为切换时刻），ETag 由时辰名称和更新时间决定，
+    客户端携带 If-None-Match 重新验证时返回 304。
+    """
+    index = get_index()
+    now = datetime.now()
+    current_slot = index.current(now)
     
-    return JsonResponse(data)
+    if not current_slot:
+        response = JsonResponse({'error': '未找到当前时辰信息'})
+        patch_cache_control(response, no_cache=True)
+        return response
+    
+    response = JsonResponse(slot_payload(current_slot))
+    
+    # 不发送 Last-Modified：更新时间属于时辰本身，上一个时辰的缓存只带 If-Modified-Since 时也会得到 304
+    etag = quote_etag(f'{current_slot.name}-{current_slot.updated_at:%Y%m%d%H%M%S%f}')
+    response.headers['ETag'] = etag
+    seconds = index.seconds_until_change(now)
+    if seconds is None:
+        seconds = SLOT_FALLBACK_MAX_AGE
+    patch_cache_control(response, public=True, max_age=seconds)
+    # 绝对的过期时间：响应取自浏览器缓存时 max-age 不会减少，页面据此安排下一次轮询
+    response.headers['Expires'] = http_date((now + timedelta(seconds=seconds)).timestamp())
+    
+    return get_conditional_response(request, etag=etag, response=response)
+
+
+async def time_slot_events(request):
+    """事件推送：时辰切换及登录用户的到期提醒
+
+    以 Server-Sent Events 保持长连接，需要在 ASGI 服务器下运行。
+    """
+    if not isinstance(request, ASGIRequest):
+        # WSGI 下无法保持异步长连接，204 会让浏览器停止重连，页面改用轮询
+        return HttpResponse(status=204)
+    user = await request.auser()
+    response = StreamingHttpResponse(
+        event_stream(user.id if user.is_authenticated else None),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    # 关闭 Nginx 等反向代理的响应缓冲
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -57,6 +58,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # 最外层：在会话、路由之前拒绝扫描器请求
+    'main.middleware.ScannerBlockMiddleware',
+    'main.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -66,11 +70,15 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# 超过该耗时（秒）的请求连同 SQL 列表写入 main.metrics 日志
+METRICS_SLOW_REQUEST_SECONDS = 1.0
+
 ROOT_URLCONF = 'tinnitus_health.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # 在 Django 模板后端基础上记录渲染耗时
+        'BACKEND': 'main.metrics.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -96,6 +104,102 @@ DATABASES = {
     }
 }
 
+# SQLite 生产配置，由 settings_prod 合并到 DATABASES，开发和测试仍使用 SQLite 默认设置；
+# bench_db 以此与默认设置对比。WAL 模式下读写互不阻塞，写事务以 IMMEDIATE 开始，
+# 避免读事务升级为写事务时直接报 "database is locked"。
+# PRAGMAS 由 main.signals 在每个新连接建立时执行。
+SQLITE_PRODUCTION_PROFILE = {
+    'CONN_MAX_AGE': int(os.environ.get('DJANGO_CONN_MAX_AGE', 600)),
+    'CONN_HEALTH_CHECKS': True,
+    'OPTIONS': {
+        'transaction_mode': 'IMMEDIATE',
+    },
+    'PRAGMAS': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 20000,
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -64000,
+    },
+}
+
+
+# 设置 POSTGRES_DB 时改用 PostgreSQL，使用 Django 自带的 psycopg 连接池
+# （需安装 requirements-postgres.txt）；连接池与持久连接不能同时启用。
+if os.environ.get('POSTGRES_DB'):
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ['POSTGRES_DB'],
+            'USER': os.environ.get('POSTGRES_USER', 'postgres'),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+            'CONN_MAX_AGE': 0,
+            'OPTIONS': {
+                'pool': {
+                    'min_size': int(os.environ.get('POSTGRES_POOL_MIN_SIZE', 2)),
+                    'max_size': int(os.environ.get('POSTGRES_POOL_MAX_SIZE', 20)),
+                    'timeout': int(os.environ.get('POSTGRES_POOL_TIMEOUT', 10)),
+                },
+            },
+        }
+    }
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# 默认使用进程内存缓存；设置 DJANGO_CACHE_DIR 后改用文件缓存，可在多个工作进程间共享
+# 会话单独使用 sessions 缓存，清空页面缓存或页面缓存条目被淘汰时不影响登录状态
+
+# default 缓存的条目上限。Django 默认只有 300 条，达到上限后随机删除三分之一，
+# 而每位活跃用户约占 3 到 5 条（助手页快照、日记版本号、报告缓存及尚未过期的旧版本报告），
+# 匿名整页缓存和片段缓存另占数百条（首页、12 个时辰、穴位列表的筛选组合及各穴位详情）。
+# 默认 50000 条可容纳约一万名活跃用户，用户更多时通过 DJANGO_CACHE_MAX_ENTRIES 调大
+DEFAULT_CACHE_MAX_ENTRIES = int(os.environ.get('DJANGO_CACHE_MAX_ENTRIES', 50000))
+SESSION_CACHE_MAX_ENTRIES = 20000
+
+if os.environ.get('DJANGO_CACHE_DIR'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ['DJANGO_CACHE_DIR'],
+            'OPTIONS': {'MAX_ENTRIES': DEFAULT_CACHE_MAX_ENTRIES},
+        },
+        'sessions': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.path.join(os.environ['DJANGO_CACHE_DIR'], 'sessions'),
+            'OPTIONS': {'MAX_ENTRIES': SESSION_CACHE_MAX_ENTRIES},
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': DEFAULT_CACHE_MAX_ENTRIES},
+        },
+        'sessions': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'sessions',
+            'OPTIONS': {'MAX_ENTRIES': SESSION_CACHE_MAX_ENTRIES},
+        },
+    }
+
+# 会话默认为 cached_db：先读 sessions 缓存，未命中再读数据库，写入时同时写两者，
+# 已登录用户的请求通常不再查询 django_session。DJANGO_SESSION_ENGINE 可改为 db 或 signed_cookies。
+# 过期会话由 purge_sessions 命令分批清理
+SESSION_ENGINE = 'django.contrib.sessions.backends.' + os.environ.get('DJANGO_SESSION_ENGINE', 'cached_db')
+SESSION_CACHE_ALIAS = 'sessions'
+
+# 提示消息只存放在签名 Cookie 中，显示消息不写会话
+MESSAGE_STORAGE = 'django.contrib.messages.storage.cookie.CookieStorage'
+
+# 匿名访问整页缓存的默认有效期（秒），内容变更时另由版本号失效
+PAGE_CACHE_TIMEOUT = 3600
+
+# 助手页用户快照在缓存中的有效期（秒），日记或提醒写入时另行重建
+DASHBOARD_SNAPSHOT_TIMEOUT = 24 * 3600
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -137,10 +241,32 @@ STATICFILES_DIRS = [
 ]
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# 开发环境下静态文件由 urls 中的 static() 直接从 static/ 目录提供，不需要预先执行 collectstatic。
+# 生产配置（settings_prod）启用 WhiteNoise 中间件，collectstatic 生成带内容哈希的文件名
+# 及 gzip、brotli 预压缩文件，带哈希的文件使用一年期的 immutable 缓存头。
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# DEBUG 关闭时是否仍由应用提供 media 文件
+SERVE_MEDIA = False
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# 时辰提醒发送后端：main.reminders.InboxBackend（站内信）、EmailBackend（按 EMAIL_BACKEND 发送邮件）
+# 或 WebhookBackend（向 REMINDER_WEBHOOK_URL 发送 JSON）
+REMINDER_DELIVERY_BACKEND = os.environ.get('REMINDER_DELIVERY_BACKEND', 'main.reminders.InboxBackend')
+REMINDER_WEBHOOK_URL = os.environ.get('REMINDER_WEBHOOK_URL', '')
+
+# 时辰查找表在进程内的最长缓存时间（秒），多进程部署时作为信号失效之外的兜底
+TIME_SLOT_INDEX_MAX_AGE = 300
@@ -0,0 +1,97 @@
+"""
+生产环境配置
+
+在开发配置的基础上关闭 DEBUG，密钥和域名从环境变量读取：
+
+    DJANGO_SETTINGS_MODULE=tinnitus_health.settings_prod python manage.py serve
+"""
+import os
+
+from .settings import *  # noqa: F401,F403
+from .settings import (
+    ALLOWED_HOSTS, BASE_DIR, DATABASES, DEFAULT_CACHE_MAX_ENTRIES, MIDDLEWARE, SESSION_CACHE_MAX_ENTRIES,
+    SQLITE_PRODUCTION_PROFILE, STORAGES, TEMPLATES,
+)
+
+DEBUG = False
+
+SECRET_KEY = os.environ['DJANGO_SECRET_KEY']
+
+ALLOWED_HOSTS = [
+    host.strip() for host in os.environ.get('DJANGO_ALLOWED_HOSTS', ','.join(ALLOWED_HOSTS)).split(',') if host.strip()
+]
+CSRF_TRUSTED_ORIGINS = [
+    origin.strip() for origin in os.environ.get('DJANGO_CSRF_TRUSTED_ORIGINS', '').split(',') if origin.strip()
+]
+
+# 使用 SQLite 时启用生产配置：WAL、IMMEDIATE 事务、持久连接等（见 settings.SQLITE_PRODUCTION_PROFILE）
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    DATABASES = {'default': {**DATABASES['default'], **SQLITE_PRODUCTION_PROFILE}}
+
+# ASGI 模式下同步视图在线程池中执行，持久连接随线程留存却不会被请求结束时回收，
+# 未通过 DJANGO_CONN_MAX_AGE 明确指定时关闭持久连接（PostgreSQL 连接池本身不使用持久连接）
+if os.environ.get('GUNICORN_MODE') == 'asgi' and 'DJANGO_CONN_MAX_AGE' not in os.environ:
+    DATABASES = {'default': {**DATABASES['default'], 'CONN_MAX_AGE': 0}}
+
+# 多个 worker 进程必须共享缓存：内容版本号、报告缓存版本、助手页快照和会话若各存一份，
+# 一个进程中的写入不会使其他进程的缓存失效。生产环境始终使用文件缓存，默认放在项目目录下
+CACHE_DIR = os.environ.get('DJANGO_CACHE_DIR') or str(BASE_DIR / 'cache')
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': CACHE_DIR,
+        'OPTIONS': {'MAX_ENTRIES': DEFAULT_CACHE_MAX_ENTRIES},
+    },
+    'sessions': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(CACHE_DIR, 'sessions'),
+        'OPTIONS': {'MAX_ENTRIES': SESSION_CACHE_MAX_ENTRIES},
+    },
+}
+
+# 通过 HTTPS 访问时设置 DJANGO_SECURE_COOKIES=1
+SESSION_COOKIE_SECURE = CSRF_COOKIE_SECURE = os.environ.get('DJANGO_SECURE_COOKIES') == '1'
+
+# 明确使用缓存模板加载器，每个模板在进程内只编译一次，临时打开 DEBUG 排查问题时也不例外
+TEMPLATES = [{
+    **TEMPLATES[0],
+    'APP_DIRS': False,
+    'OPTIONS': {
+        **TEMPLATES[0]['OPTIONS'],
+        'loaders': [
+            ('django.template.loaders.cached.Loader', [
+                'django.template.loaders.filesystem.Loader',
+                'django.template.loaders.app_directories.Loader',
+            ]),
+        ],
+    },
+}]
+
+# 静态文件由 WhiteNoise 直接提供（紧跟 SecurityMiddleware），读取 collectstatic 输出的 STATIC_ROOT
+MIDDLEWARE = list(MIDDLEWARE)
+MIDDLEWARE.insert(
+    MIDDLEWARE.index('django.middleware.security.SecurityMiddleware') + 1, 'whitenoise.middleware.WhiteNoiseMiddleware'
+)
+
+# 带内容哈希及预压缩的静态文件，需先执行 collectstatic
+STORAGES = {
+    **STORAGES,
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+
+# 未部署 Nginx 等前端服务器时由应用提供 media 文件
+SERVE_MEDIA = os.environ.get('DJANGO_SERVE_MEDIA', '1') == '1'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'root': {
+        'handlers': ['console'],
+        'level': os.environ.get('DJANGO_LOG_LEVEL', 'WARNING'),
+    },
+}